@@ -0,0 +1,440 @@
+"""
+Offline load test of the FastAPI app with local stand-ins for Pinecone, Gemini and MongoDB.
+
+    python -m benchmarks.loadTest --scenarios chat upload --concurrency 16
+    python -m benchmarks.loadTest --save-baseline main
+    python -m benchmarks.loadTest --compare main --max-regression 10
+
+Runs `main.app` in-process (startup and shutdown included) with the local vector store,
+the fake LLM and an in-memory MongoDB (mongomock-motor, or a real server with --mongo-uri),
+and drives it over ASGI:
+
+    chat     POST /bots/response against a bot built from a generated corpus
+    upload   POST /bots/upload-files, timed until the ingestion job completes
+    crawl    POST /bots/crawl against a generated static site served on localhost
+
+Prints p50/p95/p99 latency, throughput, errors and peak RSS per scenario. Baselines are
+kept in benchmarks/baselines/<name>.json; --compare exits non-zero when a latency
+percentile grows, or throughput drops, by more than --max-regression percent.
+Upload and crawl latencies include up to --poll-interval of job polling.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+BASELINE_DIR = os.path.join(REPO_ROOT, "benchmarks", "baselines")
+SCENARIOS = ("chat", "upload", "crawl")
+
+_WORDS = (
+    "account billing invoice refund shipping delivery warranty return policy password login "
+    "profile subscription plan upgrade downgrade payment card bank transfer tax receipt order "
+    "tracking carrier address support ticket agent escalation priority response hours weekend "
+    "holiday discount coupon voucher gift loyalty points reward tier member store location "
+    "pickup inventory stock size colour material care washing repair replacement battery "
+    "charger cable adapter firmware update install setup reset device bluetooth wifi network "
+    "privacy data export delete consent cookie security twofactor device session api key"
+).split()
+
+
+class HashEmbedder:
+    """
+    Bag-of-words hashing embedder that stands in for the SentenceTransformer model with
+    --fake-embeddings, so the benchmark measures the service rather than the model.
+    """
+
+    def __init__(self, dimension: int = 384):
+        import numpy as np
+        self._np = np
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts, batch_size: int = 32, show_progress_bar: bool = False, **kwargs):
+        np = self._np
+        if isinstance(texts, str):
+            return self.encode([texts])[0]
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+def make_document(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 20))
+        sentences.append(" ".join(rng.choice(_WORDS) for _ in range(length)).capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def make_query(rng: random.Random) -> str:
+    return "How do I " + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 8))) + "?"
+
+
+def build_static_site(root: str, pages: int, words: int, rng: random.Random):
+    # One directory per page: the crawler normalizes URLs to end with "/"
+    for page in range(pages):
+        links = " ".join(f'<a href="/page/{(page + step) % pages}/">page {(page + step) % pages}</a>'
+                         for step in (1, 2, 3))
+        page_dir = os.path.join(root, "page", str(page))
+        os.makedirs(page_dir, exist_ok=True)
+        with open(os.path.join(page_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write(f"<html><body><h1>Page {page}</h1><p>{make_document(rng, words)}</p>"
+                    f"<nav>{links}</nav></body></html>")
+    with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as f:
+        f.write('<html><body><h1>Home</h1><a href="/page/0/">start</a></body></html>')
+
+
+def serve_static_site(root: str) -> ThreadingHTTPServer:
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def peak_rss_mb() -> dict:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def parse_server_timing(header: str) -> dict:
+    stages = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, params = entry.partition(";")
+        if params.startswith("dur="):
+            stages[name] = float(params[4:])
+    return stages
+
+
+async def run_requests(count: int, concurrency: int, make_request):
+    """
+    Calls `await make_request(i)` for i in range(count) with at most `concurrency` in flight.
+    `make_request` returns (ok, server_timing_dict). Returns the scenario report.
+    """
+    latencies, stage_samples = [], {}
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < count:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                ok, stages = await make_request(i)
+            except Exception as e:
+                print(f"  request {i} failed: {e!r}", file=sys.stderr)
+                ok, stages = False, {}
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+            for stage, ms in stages.items():
+                stage_samples.setdefault(stage, []).append(ms)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, count))))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    report = {
+        "requests": count,
+        "concurrency": min(concurrency, count),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+    if stage_samples:
+        report["server_stages_p50_ms"] = {
+            stage: round(percentile(sorted(samples), 0.5), 2) for stage, samples in stage_samples.items()
+        }
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+async def wait_for_job(client, job: dict, poll_interval: float, timeout: float) -> dict:
+    deadline = time.monotonic() + timeout
+    while job["status"] in ("queued", "running"):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"job {job['job_id']} still {job['status']} after {timeout}s")
+        await asyncio.sleep(poll_interval)
+        response = await client.get(f"/bots/jobs/{job['job_id']}")
+        response.raise_for_status()
+        job = response.json()
+    return job
+
+
+async def upload_corpus(client, args, rng: random.Random, documents: int) -> dict:
+    files = [
+        ("files", (f"doc{i}.txt", make_document(rng, args.doc_words).encode("utf-8"), "text/plain"))
+        for i in range(documents)
+    ]
+    response = await client.post("/bots/upload-files", files=files)
+    response.raise_for_status()
+    return await wait_for_job(client, response.json(), args.poll_interval, args.job_timeout)
+
+
+async def chat_scenario(client, args) -> dict:
+    from beanie import PydanticObjectId
+
+    rng = random.Random(args.seed)
+    job = await upload_corpus(client, args, rng, args.corpus_docs)
+    if job["status"] != "completed":
+        raise RuntimeError(f"corpus ingestion {job['status']}: {job.get('error')}")
+    response = await client.post(
+        "/bots/", params={"session_id": job["session_id"]},
+        json={"name": "LoadTestBot", "systemPrompt": "You are a helpful assistant.",
+              "user": str(PydanticObjectId())}
+    )
+    response.raise_for_status()
+    bot_id = response.json()["_id"]
+
+    # A pool smaller than the request count repeats queries and exercises the answer cache
+    pool = [make_query(rng) for _ in range(args.query_pool or args.chat_requests)]
+
+    async def request(i):
+        response = await client.post("/bots/response", params={"bot_id": bot_id},
+                                     json={"userQuery": pool[i % len(pool)]})
+        return response.status_code < 400, parse_server_timing(response.headers.get("server-timing", ""))
+
+    return await run_requests(args.chat_requests, args.concurrency, request)
+
+
+async def upload_scenario(client, args) -> dict:
+    rng = random.Random(args.seed + 1)
+
+    async def request(i):
+        job = await upload_corpus(client, args, rng, args.files_per_upload)
+        return job["status"] == "completed", {}
+
+    return await run_requests(args.upload_jobs, args.concurrency, request)
+
+
+async def crawl_scenario(client, args) -> dict:
+    site_dir = tempfile.mkdtemp(prefix="loadtest-site-")
+    build_static_site(site_dir, args.site_pages, args.doc_words, random.Random(args.seed + 2))
+    server = serve_static_site(site_dir)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        async def request(i):
+            response = await client.post("/bots/crawl", json={
+                "url": url, "max_depth": args.crawl_depth, "page_limit": min(args.site_pages + 1, 100)
+            })
+            response.raise_for_status()
+            job = await wait_for_job(client, response.json(), args.poll_interval, args.job_timeout)
+            return job["status"] == "completed", {}
+
+        return await run_requests(args.crawl_jobs, args.concurrency, request)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(site_dir, ignore_errors=True)
+
+
+def configure_environment(args, work_dir: str):
+    # Must run before the app is imported: these modules read their config at import time
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.llm_tokens_per_second),
+        "VECTOR_STORE_BACKEND": "local",
+        "VECTOR_STORE_DIR": os.path.join(work_dir, "vectorStore"),
+        "LEXICAL_INDEX_DIR": os.path.join(work_dir, "lexicalIndex"),
+        "UPLOAD_SPOOL_DIR": os.path.join(work_dir, "uploads"),
+        "BOT_CACHE_CHANGE_STREAM": "false",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING")
+    })
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+        os.environ["DB_NAME"] = f"loadtest_{os.getpid()}"
+
+
+async def run_benchmark(args) -> dict:
+    import httpx
+    import main
+    from utils.db import init_db
+    from utils.embeddingModels import _models, EMBEDDING_MODEL_NAME
+
+    if args.fake_embeddings:
+        _models[EMBEDDING_MODEL_NAME] = HashEmbedder()
+
+    mongo_client = None
+    if not args.mongo_uri:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("Install mongomock-motor (pip install -r requirements-dev.txt) for the in-memory MongoDB, or pass --mongo-uri")
+        mongo_client = AsyncMongoMockClient()
+        main.init_db = partial(init_db, database=mongo_client["loadtest"])
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest",
+                                     timeout=args.job_timeout) as client:
+            for name in args.scenarios:
+                print(f"running {name}...", file=sys.stderr)
+                scenario = {"chat": chat_scenario, "upload": upload_scenario, "crawl": crawl_scenario}[name]
+                results[name] = await scenario(client, args)
+            if args.mongo_uri:
+                from utils.db import DB_NAME
+                from models.userModel import User
+                await User.get_motor_collection().database.client.drop_database(DB_NAME)
+    return results
+
+
+def environment_info() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit
+    }
+
+
+def print_report(results: dict):
+    print(f"{'scenario':<8} {'reqs':>6} {'conc':>5} {'errors':>6} {'rps':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rss MB':>8}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['requests']:>6} {r['concurrency']:>5} {r['errors']:>6} {r['throughput_rps']:>9.2f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['peak_rss_mb']['self']:>8.1f}")
+        if r.get("server_stages_p50_ms"):
+            stages = ", ".join(f"{stage}={ms:.1f}" for stage, ms in r["server_stages_p50_ms"].items())
+            print(f"{'':<8} server p50 ms: {stages}")
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> bool:
+    """
+    Prints the change of each metric against `baseline` and returns True if any latency
+    percentile rose, or throughput fell, by more than `max_regression` percent.
+    """
+    regressed = False
+    print(f"\ncompared with baseline '{baseline['name']}' ({baseline['created_at']}, "
+          f"commit {baseline['environment'].get('git_commit') or '?'})")
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<8} not in baseline")
+            continue
+        if previous["requests"] != current["requests"] or previous["concurrency"] != current["concurrency"]:
+            print(f"{name:<8} warning: baseline used {previous['requests']} requests at concurrency "
+                  f"{previous['concurrency']}")
+        changes = []
+        for metric, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True),
+                                        ("throughput_rps", False)):
+            before, after = previous[metric], current[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            worse = change > max_regression if higher_is_worse else -change > max_regression
+            regressed = regressed or worse
+            changes.append(f"{metric} {before:.2f}->{after:.2f} ({change:+.1f}%){' REGRESSION' if worse else ''}")
+        print(f"{name:<8} " + "; ".join(changes))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=["chat", "upload"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--chat-requests", type=int, default=200)
+    parser.add_argument("--query-pool", type=int, default=0, help="distinct queries (default: all unique)")
+    parser.add_argument("--corpus-docs", type=int, default=50, help="documents behind the chat bot")
+    parser.add_argument("--upload-jobs", type=int, default=20)
+    parser.add_argument("--files-per-upload", type=int, default=5)
+    parser.add_argument("--crawl-jobs", type=int, default=2)
+    parser.add_argument("--site-pages", type=int, default=20)
+    parser.add_argument("--crawl-depth", type=int, default=3)
+    parser.add_argument("--doc-words", type=int, default=800)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=50)
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="hash embeddings instead of loading the SentenceTransformer model")
+    parser.add_argument("--mongo-uri", help="use this MongoDB (a throwaway database) instead of mongomock")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--job-timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="percent")
+    parser.add_argument("--json", metavar="PATH", help="also write the report to PATH")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json"), encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    work_dir = tempfile.mkdtemp(prefix="loadtest-")
+    try:
+        configure_environment(args, work_dir)
+        results = asyncio.run(run_benchmark(args))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "config": {k: v for k, v in vars(args).items()
+                   if k not in ("save_baseline", "compare", "max_regression", "json", "mongo_uri")},
+        "results": results
+    }
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"name": args.save_baseline, **report}, f, indent=2)
+        print(f"\nbaseline saved to {os.path.relpath(path, REPO_ROOT)}")
+    if baseline is not None and compare(results, baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Page-parallel PDF extraction benchmark.
+
+    python -m benchmarks.pdfExtraction path/to/large.pdf --workers 1 2 4 8
+
+Extracts the whole document with each worker count and prints pages/second and the
+speedup over a single worker.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pdfExtractor import count_pdf_pages, extract_pdf_page_range, PDF_PAGES_PER_TASK
+
+
+def run(file_path: str, workers: int, pages_per_task: int) -> float:
+    page_count = count_pdf_pages(file_path)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(extract_pdf_page_range, file_path, first, first + pages_per_task)
+            for first in range(0, page_count, pages_per_task)
+        ]
+        pages = sum(len(future.result()) for future in futures)
+    elapsed = time.perf_counter() - start
+    assert pages == page_count
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--pages-per-task", type=int, default=PDF_PAGES_PER_TASK)
+    args = parser.parse_args()
+
+    page_count = count_pdf_pages(args.pdf)
+    print(f"{args.pdf}: {page_count} pages, {args.pages_per_task} pages per task")
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        elapsed = run(args.pdf, workers, args.pages_per_task)
+        baseline = baseline or elapsed
+        print(f"workers={workers:<3} {elapsed:8.2f}s  {page_count / elapsed:8.1f} pages/s  speedup x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Recall vs. size of float16 / int8 vector storage against the float32 baseline.
+
+    python -m benchmarks.quantizationRecall docs/ manuals/guide.pdf --top-k 5 10
+    python -m benchmarks.quantizationRecall --vectors corpus.npy --queries queries.txt
+
+Chunks and embeds the given files (or directories) the way ingestion does, or loads
+precomputed vectors from a .npy file. Queries come from --queries (one per line) or are
+sampled from the corpus: a random span of a chunk, so each query has a true neighbour.
+For every storage dtype it prints bytes per vector, total size, recall@k against exact
+float32 search, the mean score error, and the query time of asymmetric and dequantize scoring.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.vectorQuantization import STORAGE_DTYPES, quantize, dequantize, score, storage_bytes
+
+
+def load_chunks(paths) -> list:
+    from utils.filesParser import extract_text_from_file
+    from utils.combiningAndChunking import split_into_chunks
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(root, name) for root, _, names in os.walk(path) for name in sorted(names))
+        else:
+            files.append(path)
+    texts, chunks = [], []
+    for file_path in files:
+        content = extract_text_from_file(file_path)
+        # Tabular files come back already chunked
+        if isinstance(content, list):
+            chunks.extend(content)
+        elif content:
+            texts.append(content)
+    chunks.extend(asyncio.run(split_into_chunks(texts)))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def sample_queries(chunks: list, count: int, rng: random.Random) -> list:
+    queries = []
+    for chunk in rng.sample(chunks, min(count, len(chunks))):
+        words = chunk.split()
+        length = min(len(words), rng.randint(6, 20))
+        start = rng.randint(0, len(words) - length)
+        queries.append(" ".join(words[start:start + length]))
+    return queries
+
+
+def embed(texts: list) -> np.ndarray:
+    from utils.embeddingModels import get_embedding_model
+
+    vectors = get_embedding_model().encode(texts, batch_size=32, show_progress_bar=False)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def evaluate(corpus: np.ndarray, queries: np.ndarray, ks) -> list:
+    exact = [corpus @ query for query in queries]
+    rows = []
+    for name in STORAGE_DTYPES:
+        codes, scales = quantize(corpus, np.dtype(STORAGE_DTYPES[name]))
+
+        start = time.perf_counter()
+        approx = [score(codes, scales, query) for query in queries]
+        asymmetric_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        # Dequantize scoring pays for the float32 copy once, then scores like float32
+        dequantized = dequantize(codes, scales)
+        start = time.perf_counter()
+        for query in queries:
+            dequantized @ query
+        dequantize_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        recalls = {}
+        for k in ks:
+            hits = sum(len(set(top_k(e, k)) & set(top_k(a, k))) for e, a in zip(exact, approx))
+            recalls[k] = hits / (len(queries) * min(k, len(corpus)))
+        rows.append({
+            "dtype": name,
+            "bytes_per_vector": storage_bytes(1, corpus.shape[1], codes.dtype),
+            "total_mb": storage_bytes(len(corpus), corpus.shape[1], codes.dtype) / 1024 / 1024,
+            "recall": recalls,
+            "score_error": float(np.mean([np.abs(e - a).mean() for e, a in zip(exact, approx)])),
+            "asymmetric_ms": asymmetric_ms,
+            "dequantize_ms": dequantize_ms
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="files or directories to chunk and embed")
+    parser.add_argument("--vectors", help="precomputed corpus embeddings (.npy) instead of paths")
+    parser.add_argument("--queries", help="file with one query per line")
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chunks = []
+    if args.vectors:
+        corpus = np.load(args.vectors).astype(np.float32)
+    elif args.paths:
+        chunks = load_chunks(args.paths)
+        print(f"embedding {len(chunks)} chunks...", file=sys.stderr)
+        corpus = embed(chunks)
+    else:
+        parser.error("pass files/directories or --vectors")
+
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            query_vectors = embed([line.strip() for line in f if line.strip()])
+    elif chunks:
+        query_vectors = embed(sample_queries(chunks, args.num_queries, rng))
+    else:
+        # Precomputed vectors without query text: perturbed corpus rows stand in for queries
+        picks = np.random.default_rng(args.seed).choice(len(corpus), min(args.num_queries, len(corpus)), replace=False)
+        noise = np.random.default_rng(args.seed + 1).standard_normal((len(picks), corpus.shape[1]))
+        query_vectors = normalize(corpus[picks]) + 0.05 * noise.astype(np.float32)
+
+    corpus = normalize(corpus)
+    query_vectors = normalize(query_vectors)
+    print(f"{len(corpus)} vectors x {corpus.shape[1]} dims, {len(query_vectors)} queries")
+
+    recall_headers = "".join(f"{'recall@' + str(k):>11}" for k in args.top_k)
+    print(f"{'dtype':<8} {'B/vector':>9} {'total MB':>9}{recall_headers} {'score err':>10} "
+          f"{'asym ms/q':>10} {'deq ms/q':>9}")
+    for row in evaluate(corpus, query_vectors, args.top_k):
+        recalls = "".join(f"{row['recall'][k]:>11.4f}" for k in args.top_k)
+        print(f"{row['dtype']:<8} {row['bytes_per_vector']:>9} {row['total_mb']:>9.2f}{recalls} "
+              f"{row['score_error']:>10.5f} {row['asymmetric_ms']:>10.3f} {row['dequantize_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
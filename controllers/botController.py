@@ -1,48 +1,131 @@
 from datetime import datetime, timezone
+import asyncio
+import base64
+import json
+import logging
+import time
 import uuid
 from fastapi import HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.encoders import jsonable_encoder
 from beanie import PydanticObjectId
 from models.botModel import Bot
-from models.chatHistoryModel import ChatHistory
+from models.chatHistoryModel import ChatMessage
 from models.tempStorageModel import TempStorage
-from utils.crawler import crawl_recursive_batch
+from models.ingestionJobModel import IngestionJob
+from models.pageManifestModel import PageManifest
+from utils.crawler import crawl_recursive_batch, normalize_url
 from utils import combiningAndChunking
 from utils import getGeminiRes
+from utils import recrawl
 from utils.filesParser import extract_text_from_file
+from utils.pdfExtractor import iter_pdf_pages
+from utils.tabularParser import is_tabular, iter_table_blocks, render_row_groups
+from utils.vectorStore import get_vector_store, make_vector_id
+from utils.executors import run_cpu, run_io, ByteBudget
+from utils.embeddingScheduler import embed_query
+from utils.answerCache import answer_cache, invalidate_bot_answers
+from utils.lexicalIndex import lexical_index
+from utils.botCache import bot_cache
+from utils.metrics import timed, observe_stage
+from utils.tempStaging import TempStorageWriter, iter_staged_chunks, iter_staged_pages
+from utils.ingestionJobs import ingestion_jobs, job_spool_dir, JobProgress, UPLOAD_CHUNK_BYTES, UPLOAD_MAX_INFLIGHT_BYTES
 from beanie.operators import Eq
 import shutil
-from typing import List
+from typing import List, Optional
+from pymongo import DESCENDING
 import os
 
+logger = logging.getLogger(__name__)
 
 
-async def create_bot(bot: Bot) -> Bot:
+async def create_bot(bot: Bot, session_id: str) -> Bot:
     try:
+        # session_id comes from the crawl/upload job response
+        if not await TempStorage.find_one(Eq(TempStorage.session_id, session_id)):
+            return JSONResponse(status_code=404, content={"detail": "No temp storage found for this session_id"})
+
         await bot.insert()
-        
-        #retrieve chunks from temp storage using session_id
-        temp_storage = await TempStorage.find(Eq(TempStorage.session_id, "d224b4bc-d21b-4d73-84c2-cdcc4731b701" )).to_list()
-        if not temp_storage:
-            return JSONResponse(status_code=404, detail="No temp storage found for this session_id")
-        chunks = []
-        for storage in temp_storage:
-            if storage.dataChunks and isinstance(storage.dataChunks, list):
-                chunks.extend(storage.dataChunks)
-            else:
-                raise ValueError(f"Invalid or missing 'dataChunks' in temp storage document with id: {storage.id}")
-        # print("chunks: ", chunks[10])
-        
-        # Embed and push to Pinecone
-        await combiningAndChunking.embed_and_push(
-            chunks=chunks,
-            botId=str(bot.id)
-        )
+        bot_id = str(bot.id)
+
+        try:
+            # A crawl session also staged its pages: they become the bot's page manifest, so
+            # a later refresh can delete the vectors of pages that change or disappear
+            pages = {page["url"]: page async for page in iter_staged_pages(session_id)}
+            written_ids = set()
+
+            async def on_written(records):
+                if pages:
+                    written_ids.update(vector_id for vector_id, _, _ in records)
+
+            # One pipeline over the whole session, fed straight from the staging cursor
+            report = await combiningAndChunking.embed_and_push(
+                chunks=iter_staged_chunks(session_id),
+                botId=bot_id,
+                on_written=on_written
+            )
+            if report["failed"]:
+                raise HTTPException(
+                    status_code=502,
+                    detail=f"{report['failed']} of {report['total']} chunks could not be written to the vector "
+                           f"store. The staged content was kept, try creating the bot again."
+                )
+            if pages:
+                await _write_page_manifests(bot_id, session_id, pages, written_ids)
+        except Exception:
+            # No half-indexed bot is left behind; the staged chunks stay for a retry
+            await _discard_bot(bot)
+            raise
+
+        await TempStorage.find(Eq(TempStorage.session_id, session_id)).delete()
         return bot
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating bot: {str(e)}")
 
+
+async def _write_page_manifests(bot_id: str, session_id: str, pages: dict, written_ids: set):
+    """
+    Creates the page manifest of a bot built from a crawl session. Each page references
+    the ids of its chunks that were written, including chunks it shares with other pages
+    (stored once under the same id), but not chunks dropped as duplicates before embedding.
+    """
+    vector_ids = {page_url: {} for page_url in pages}
+    async for batch in iter_staged_chunks(session_id):
+        for chunk in batch:
+            if not isinstance(chunk, dict) or chunk.get("source") not in vector_ids:
+                continue
+            vector_id = make_vector_id(bot_id, chunk["text"])
+            if vector_id in written_ids:
+                vector_ids[chunk["source"]][vector_id] = None
+    await PageManifest.insert_many([
+        PageManifest(
+            bot_id=bot_id,
+            url=page_url,
+            etag=page.get("etag"),
+            last_modified=page.get("last_modified"),
+            content_hash=page["content_hash"],
+            vector_ids=list(vector_ids[page_url]),
+            links=page.get("links") or []
+        )
+        for page_url, page in pages.items()
+    ])
+
+
+async def _discard_bot(bot: Bot):
+    bot_id = str(bot.id)
+    namespace = os.getenv("PINECONE_NAMESPACE")
+    try:
+        await get_vector_store().delete_bot(bot_id, namespace=namespace)
+        await lexical_index.delete_bot(bot_id, namespace=namespace)
+        await PageManifest.find(Eq(PageManifest.bot_id, bot_id)).delete()
+        await bot.delete()
+        bot_cache.invalidate(bot_id)
+    except Exception as e:
+        logger.error("Could not remove partially created bot %s: %s", bot_id, e)
+
 async def get_all_bots_for_user(user_id: str, fetch_links: bool = False):
     try:
         bots = await Bot.find(
@@ -56,7 +139,7 @@ async def get_all_bots_for_user(user_id: str, fetch_links: bool = False):
 
 async def get_bot(bot_id: str, fetch_links: bool = True) -> Bot:
     try:
-        bot = await Bot.get(PydanticObjectId(bot_id), fetch_links=fetch_links)
+        bot = await bot_cache.get(bot_id, fetch_links=fetch_links)
         if not bot:
             return JSONResponse(status_code=404, content={"detail": "Bot not found!"})
         return bot
@@ -71,12 +154,20 @@ async def update_bot(bot_id: str, update_data: dict):
             return JSONResponse(status_code=404, content={"detail": "Bot not found!"})
 
         update_data = jsonable_encoder(update_data)
+        previous = (bot.systemPrompt, bot.language, bot.contextTokenBudget)
 
-        for field, value in update_data.items():
-            if hasattr(bot, field):
-                setattr(bot, field, value)
+        # $set only the given fields: a full save could roll back a concurrent answerVersion bump
+        changes = {field: value for field, value in update_data.items()
+                   if hasattr(bot, field) and field not in ("id", "answerVersion")}
+        for field, value in changes.items():
+            setattr(bot, field, value)
 
-        await bot.save()
+        if changes:
+            await bot.set(changes)
+        bot_cache.invalidate(bot_id)
+        # Cached answers depend on the prompt, language and context size they were generated with
+        if (bot.systemPrompt, bot.language, bot.contextTokenBudget) != previous:
+            await invalidate_bot_answers(bot_id)
         return bot
 
     except Exception as e:
@@ -89,6 +180,11 @@ async def delete_bot(bot_id: str):
             return JSONResponse(status_code=404, content={"detail": "Bot not found!"})
         
         await bot.delete()
+        bot_cache.invalidate(bot_id)
+        await get_vector_store().delete_bot(bot_id, namespace=os.getenv("PINECONE_NAMESPACE"))
+        await lexical_index.delete_bot(bot_id, namespace=os.getenv("PINECONE_NAMESPACE"))
+        answer_cache.invalidate_bot(bot_id)
+        await PageManifest.find(Eq(PageManifest.bot_id, bot_id)).delete()
         return JSONResponse(status_code=200, content={"detail": "Bot deleted successfully."})
     
     except Exception as e:
@@ -98,123 +194,557 @@ async def crawl_website_controller(
     url: str,
     max_depth: int = 3,
     max_concurrent: int = 10,
-    page_limit: int = 20
+    page_limit: int = 20,
+    session_id: Optional[str] = None,
+    progress=None
 ):
-    CRAWL_DIR = "crawlOutput"
     try:
-        result = await crawl_recursive_batch(
-            start_urls=[url],
-            max_depth=max_depth,
-            max_concurrent=max_concurrent,
-            page_limit=page_limit
-        )
-        print(result)
-        
-        # Load markdown files from crawlOutput/
-        texts = await combiningAndChunking.load_markdown_texts()
-        shutil.rmtree(CRAWL_DIR)
-        if not texts:
-            raise HTTPException(status_code=404, detail="No markdown files found.")
+        # Per-job state: pages are chunked and staged as they stream in
+        writer = TempStorageWriter(session_id=session_id or str(uuid.uuid4()))
+        pages = 0
+
+        async def on_page(page_url: str, markdown: str, links=None, headers=None):
+            nonlocal pages
+            norm_url = normalize_url(page_url)
+            with timed("ingest", "chunk"):
+                chunks = await combiningAndChunking.split_into_chunks([markdown])
+            # The source URL ties each chunk to its page manifest entry when the bot is created
+            await writer.add([{"text": chunk, "source": norm_url} for chunk in chunks])
+            etag, last_modified = recrawl.validators_from_headers(headers)
+            await writer.add_page({
+                "url": norm_url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_hash": recrawl.content_hash(markdown),
+                "links": links or []
+            })
+            pages += 1
+            if progress:
+                await progress(pages_crawled=pages, chunks=writer.total_chunks)
 
-        # Split into chunks
-        chunks = await combiningAndChunking.split_into_chunks(texts)
+        # Includes chunking and staging of each page, which run inside on_page
+        with timed("ingest", "crawl"):
+            result = await crawl_recursive_batch(
+                start_urls=[url],
+                on_page=on_page,
+                max_depth=max_depth,
+                max_concurrent=max_concurrent,
+                page_limit=page_limit
+            )
+        await writer.flush()
+        logger.info("Crawl of %s finished: %s", url, result)
 
-        if not chunks:
+        if not result["pages_saved"]:
+            raise HTTPException(status_code=404, detail="No content found while crawling.")
+        if not writer.total_chunks:
             raise HTTPException(status_code=500, detail="Failed to split text into chunks.")
-        
-        # Store the crawled data in TempStorage
-        temp_storage = TempStorage(
-            session_id=str(uuid.uuid4()),
-            dataChunks=chunks
-        )
-        await temp_storage.insert()
+
         return {
             "success": True,
             "message": f"Crawled {result['pages_crawled']} pages.",
-            "details": result
+            "session_id": writer.session_id,
+            "details": {**result, "chunks": writer.total_chunks}
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Crawling failed: {str(e)}")
 
     
     
-async def process_uploaded_files(files: List[UploadFile]):
-    UPLOAD_DIR = "uploadedFiles"
+async def _delete_unreferenced_vectors(bot_id: str, vector_ids, namespace: Optional[str]) -> int:
+    """
+    Deletes vectors no page of the bot still points to. Identical chunks (e.g. a shared
+    footer) map to the same id on many pages, so an id is only dropped once unreferenced.
+    """
+    vector_ids = set(vector_ids)
+    if not vector_ids:
+        return 0
+    still_used = await PageManifest.find(
+        {"bot_id": bot_id, "vector_ids": {"$in": list(vector_ids)}}
+    ).to_list()
+    for entry in still_used:
+        vector_ids.difference_update(entry.vector_ids)
+    if vector_ids:
+        await get_vector_store().delete(list(vector_ids), namespace=namespace, botId=bot_id)
+        await lexical_index.delete(list(vector_ids), botId=bot_id, namespace=namespace)
+    return len(vector_ids)
+
+
+async def refresh_website_controller(
+    bot_id: str,
+    url: str,
+    max_depth: int = 3,
+    max_concurrent: int = 10,
+    page_limit: int = 20,
+    progress=None
+):
+    """
+    Incrementally refreshes a bot's website knowledge using its page manifest: pages that
+    answer 304 to a conditional request or whose content hash is unchanged are skipped,
+    the new chunks of changed/new pages are staged and embedded in one push once the crawl
+    is done, and vectors no page references any more are deleted. Bots created from a
+    crawl get their manifest at creation. Bots without one (created from uploads, or
+    before manifests were written at creation) build it on their first refresh: chunks
+    already embedded are overwritten, not duplicated, since vector ids are deterministic,
+    but the vectors of pages that vanished before that refresh cannot be traced and stay
+    until the bot is deleted.
+    """
+    namespace = os.getenv("PINECONE_NAMESPACE")
+    # New chunks of changed pages wait here until the crawl is done
+    writer = TempStorageWriter(session_id=str(uuid.uuid4()))
     try:
-        if not os.path.exists(UPLOAD_DIR):
-            os.makedirs(UPLOAD_DIR)
+        manifest = {
+            entry.url: entry
+            for entry in await PageManifest.find(Eq(PageManifest.bot_id, bot_id)).to_list()
+        }
+        seen = set()
+        # url -> (manifest entry or None, new manifest fields, vector ids of the page's chunks)
+        changed = {}
+        counters = {
+            "pages_unchanged": 0, "pages_changed": 0, "pages_new": 0, "pages_deleted": 0,
+            "chunks_embedded": 0, "vectors_deleted": 0
+        }
+
+        async def report():
+            if progress:
+                await progress(**counters)
+
+        async def skip_url(page_url: str):
+            entry = manifest.get(page_url)
+            if entry is None:
+                return None
+            if await recrawl.is_unchanged(entry.url, entry.etag, entry.last_modified):
+                seen.add(page_url)
+                counters["pages_unchanged"] += 1
+                await report()
+                return entry.links
+            return None
+
+        async def on_page(page_url: str, markdown: str, links=None, headers=None):
+            norm_url = normalize_url(page_url)
+            seen.add(norm_url)
+            etag, last_modified = recrawl.validators_from_headers(headers)
+            digest = recrawl.content_hash(markdown)
+            entry = manifest.get(norm_url)
+            fields = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "links": links or [],
+                "updated_at": datetime.now(timezone.utc)
+            }
+
+            if entry is not None and entry.content_hash == digest:
+                counters["pages_unchanged"] += 1
+                await entry.set(fields)
+                await report()
+                return
+
+            with timed("ingest", "chunk"):
+                chunks = await combiningAndChunking.split_into_chunks([markdown])
+            chunk_by_id = {make_vector_id(bot_id, chunk): chunk for chunk in chunks}
+            old_ids = set(entry.vector_ids) if entry is not None else set()
+            await writer.add([
+                {"text": chunk, "source": norm_url}
+                for vid, chunk in chunk_by_id.items() if vid not in old_ids
+            ])
+            changed[norm_url] = (entry, {**fields, "content_hash": digest}, list(chunk_by_id))
+            counters["pages_new" if entry is None else "pages_changed"] += 1
+            await report()
+
+        with timed("ingest", "crawl"):
+            result = await crawl_recursive_batch(
+                start_urls=[url],
+                on_page=on_page,
+                max_depth=max_depth,
+                max_concurrent=max_concurrent,
+                page_limit=page_limit,
+                skip_url=skip_url
+            )
+
+        # One push for every changed page: one dedup pass, one answer invalidation
+        await writer.flush()
+        written_ids = set()
+        if writer.total_chunks:
+            async def on_written(records):
+                written_ids.update(vector_id for vector_id, _, _ in records)
+
+            push_report = await combiningAndChunking.embed_and_push(
+                iter_staged_chunks(writer.session_id), botId=bot_id, namespace=namespace, on_written=on_written
+            )
+            if push_report["failed"]:
+                raise RuntimeError(f"Failed to upsert {push_report['failed']} of {push_report['total']} chunks")
+            counters["chunks_embedded"] = push_report["written"]
+
+        # A page keeps the ids it already had and gains the ones actually written: chunks
+        # dropped as duplicates before embedding were never stored under their own id
+        stale_ids = set()
+        for page_url, (entry, fields, page_ids) in changed.items():
+            old_ids = set(entry.vector_ids) if entry is not None else set()
+            vector_ids = [vid for vid in page_ids if vid in old_ids or vid in written_ids]
+            if entry is None:
+                entry = PageManifest(bot_id=bot_id, url=page_url, **fields)
+            else:
+                for field, value in fields.items():
+                    setattr(entry, field, value)
+            entry.vector_ids = vector_ids
+            await entry.save()
+            manifest[page_url] = entry
+            stale_ids.update(old_ids - set(vector_ids))
 
-        texts_to_chunk = []
-        final_chunks = []
+        # Pages that now 404/410, and - if the whole site was covered - pages no longer linked
+        gone = set(result["gone_urls"])
+        if not result["truncated"]:
+            gone.update(page_url for page_url in manifest if page_url not in seen)
+        gone_entries = [manifest[page_url] for page_url in gone if page_url in manifest]
+        for entry in gone_entries:
+            stale_ids.update(entry.vector_ids)
+            await entry.delete()
+        counters["pages_deleted"] = len(gone_entries)
+        # Only after every manifest is up to date, so shared chunks are seen as still referenced
+        counters["vectors_deleted"] = await _delete_unreferenced_vectors(bot_id, stale_ids, namespace)
+        # The push already invalidated cached answers; deletions made after it must too
+        if counters["vectors_deleted"]:
+            await invalidate_bot_answers(bot_id)
+        await report()
 
-        for file in files:
-            unique_filename = f"{uuid.uuid4()}_{file.filename}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+        return {
+            "success": True,
+            "message": f"Refreshed {result['pages_crawled']} pages.",
+            "details": {**counters, "pages_crawled": result["pages_crawled"], "truncated": result["truncated"]}
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Refresh failed: {str(e)}")
+    finally:
+        await TempStorage.find(Eq(TempStorage.session_id, writer.session_id)).delete()
 
-            extracted = extract_text_from_file(file_path)
+    
+    
+async def save_uploaded_files(files: List[UploadFile], upload_dir: str, chunk_bytes: int = UPLOAD_CHUNK_BYTES):
+    # Private per-job directory; files are copied in fixed-size pieces, never read whole
+    os.makedirs(upload_dir, mode=0o700, exist_ok=True)
+    for file in files:
+        unique_filename = f"{uuid.uuid4()}_{os.path.basename(file.filename)}"
+        file_path = os.path.join(upload_dir, unique_filename)
+        with open(file_path, "wb") as f:
+            while True:
+                piece = await file.read(chunk_bytes)
+                if not piece:
+                    break
+                await run_io(f.write, piece)
+        await file.close()
+
+
+async def process_uploaded_files(upload_dir: str, session_id: Optional[str] = None, progress=None):
+    """
+    Parses every file in upload_dir in parallel on the process pool, with at most
+    UPLOAD_MAX_INFLIGHT_BYTES of files being parsed at once. Each file is chunked and
+    staged as soon as its parse finishes. A file that cannot be parsed is logged and
+    skipped, and listed in `skipped_files`.
+    """
+    try:
+        writer = TempStorageWriter(session_id=session_id or str(uuid.uuid4()))
+        budget = ByteBudget(UPLOAD_MAX_INFLIGHT_BYTES)
+        bytes_parsed = 0
+        files_parsed = 0
+        files_skipped = []
+
+        async def parse(file_name: str):
+            try:
+                await parse_file(file_name)
+            except asyncio.CancelledError:
+                # The job is being cancelled; that is not a problem with this file
+                raise
+            except Exception as e:
+                # One unreadable file must not fail the whole upload
+                logger.error("Skipping %s, it could not be parsed: %s", file_name, e)
+                files_skipped.append(file_name.split("_", 1)[-1])
+
+        async def parse_file(file_name: str):
+            nonlocal bytes_parsed, files_parsed
+            file_path = os.path.join(upload_dir, file_name)
+            size = os.path.getsize(file_path)
+            if file_name.lower().endswith(".pdf"):
+                # PDFs are extracted page-parallel and chunked while pages stream in
+                source = file_name.split("_", 1)[-1]
+                # Extraction and chunking are interleaved; timed together as "parse"
+                async with budget.reserve(size):
+                    parse_started = time.perf_counter()
+                    batch = []
+                    async for chunk in combiningAndChunking.split_pages_into_chunks(iter_pdf_pages(file_path)):
+                        batch.append({**chunk, "source": source})
+                        if len(batch) >= writer.flush_size:
+                            await writer.add(batch)
+                            batch = []
+                    await writer.add(batch)
+                    observe_stage("ingest", "parse", time.perf_counter() - parse_started)
+                extracted = None
+            elif is_tabular(file_name):
+                # The reader keeps open-file state between blocks, so it cannot move to another
+                # process and stays on a thread; rendering a block is GIL-bound pandas string
+                # work and runs on the process pool. Memory stays constant, so no byte budget.
+                blocks = iter_table_blocks(file_path)
+                try:
+                    while True:
+                        with timed("ingest", "parse"):
+                            block = await run_io(next, blocks, None)
+                            if block is None:
+                                break
+                            chunks = await run_cpu(render_row_groups, block)
+                        if chunks:
+                            await writer.add(chunks)
+                finally:
+                    # Closes the file even when a malformed row stops the read halfway
+                    await run_io(blocks.close)
+                extracted = None
+            else:
+                async with budget.reserve(size):
+                    with timed("ingest", "parse"):
+                        extracted = await run_cpu(extract_text_from_file, file_path)
             if extracted:
-                if file.filename.endswith(".csv"):
-                    final_chunks.extend(extracted if isinstance(extracted, list) else [extracted])
-                else:
-                    texts_to_chunk.extend(extracted if isinstance(extracted, list) else [extracted])
-
-        shutil.rmtree(UPLOAD_DIR)
-        # print("texts to chunks: ", texts_to_chunk)
-        # print("\n\n final chunks: ", final_chunks[0])
-        if texts_to_chunk:
-            non_csv_chunks = await combiningAndChunking.split_into_chunks(texts_to_chunk)
-            final_chunks.extend(non_csv_chunks)        
-        
+                extracted = extracted if isinstance(extracted, list) else [extracted]
+                with timed("ingest", "chunk"):
+                    chunks = await combiningAndChunking.split_into_chunks(extracted)
+                await writer.add(chunks)
+            files_parsed += 1
+            bytes_parsed += size
+            if progress:
+                await progress(files_parsed=files_parsed, bytes_parsed=bytes_parsed, chunks=writer.total_chunks)
+
+        tasks = [asyncio.create_task(parse(file_name)) for file_name in sorted(os.listdir(upload_dir))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        await writer.flush()
         
-        if not final_chunks:
+        if not writer.total_chunks:
             raise HTTPException(status_code=400, detail="No valid text extracted or chunked from files.")
 
-        # Store the processed data in TempStorage
-        temp_storage = TempStorage(
-            session_id=str(uuid.uuid4()),
-            dataChunks=final_chunks
-        )
-        await temp_storage.insert()
+        if progress:
+            await progress(chunks=writer.total_chunks)
         return {
-            "message": f"Successfully processed all files.",
-            "chunks": len(final_chunks)
+            "message": f"Successfully processed {files_parsed} files.",
+            "session_id": writer.session_id,
+            "chunks": writer.total_chunks,
+            "skipped_files": files_skipped
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
 
+
+async def _run_crawl_job(job: IngestionJob, progress: JobProgress):
+    return await crawl_website_controller(**job.params, session_id=job.session_id, progress=progress)
+
+
+async def _run_refresh_job(job: IngestionJob, progress: JobProgress):
+    return await refresh_website_controller(**job.params, progress=progress)
+
+
+async def _run_upload_job(job: IngestionJob, progress: JobProgress):
+    return await process_uploaded_files(job_spool_dir(str(job.id)), session_id=job.session_id, progress=progress)
+
+
+ingestion_jobs.register("crawl", _run_crawl_job)
+ingestion_jobs.register("upload", _run_upload_job)
+ingestion_jobs.register("refresh", _run_refresh_job)
+
+
+def _job_response(job: IngestionJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "kind": job.kind,
+        "status": job.status,
+        "session_id": job.session_id,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at
+    }
+
+
+async def submit_crawl_job(url: str, max_depth: int = 3, max_concurrent: int = 10, page_limit: int = 20):
+    params = {"url": url, "max_depth": max_depth, "max_concurrent": max_concurrent, "page_limit": page_limit}
+    job = await ingestion_jobs.submit("crawl", params, session_id=str(uuid.uuid4()))
+    return _job_response(job)
+
+
+async def submit_refresh_job(bot_id: str, url: str, max_depth: int = 3, max_concurrent: int = 10, page_limit: int = 20):
+    bot = await Bot.get(PydanticObjectId(bot_id))
+    if not bot:
+        return JSONResponse(status_code=404, content={"detail": "Bot not found!"})
+    params = {"bot_id": bot_id, "url": url, "max_depth": max_depth, "max_concurrent": max_concurrent, "page_limit": page_limit}
+    job = await ingestion_jobs.submit("refresh", params)
+    return _job_response(job)
+
+
+async def submit_upload_job(files: List[UploadFile]):
+    # Files must be on disk before the request ends; the job parses them later
+    job_id = PydanticObjectId()
+    spool_dir = job_spool_dir(str(job_id))
+    try:
+        await save_uploaded_files(files, spool_dir)
+        job = await ingestion_jobs.submit("upload", {}, session_id=str(uuid.uuid4()), job_id=job_id)
+    except Exception:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        raise
+    return _job_response(job)
+
+
+async def get_ingestion_job(job_id: str):
+    try:
+        job = await ingestion_jobs.get(job_id)
+        if not job:
+            return JSONResponse(status_code=404, content={"detail": "Job not found!"})
+        return _job_response(job)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching job: {str(e)}")
+
+
+async def cancel_ingestion_job(job_id: str):
+    try:
+        job = await ingestion_jobs.cancel(job_id)
+        if not job:
+            return JSONResponse(status_code=404, content={"detail": "Job not found!"})
+        return _job_response(job)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error cancelling job: {str(e)}")
     
     
     
+async def save_chat_message(bot: Bot, query: str, response: str):
+    # Append-only: a single insert, never reads or rewrites earlier messages
+    chatMessage = ChatMessage(
+        bot_id=bot.id,
+        user_query=query,
+        bot_response=response,
+        timestamp=datetime.now(timezone.utc)
+    )
+    with timed("chat", "history_write"):
+        await chatMessage.insert()
+
+
+def _encode_history_cursor(message: ChatMessage) -> str:
+    raw = f"{message.timestamp.isoformat()}|{message.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_history_cursor(cursor: str):
+    raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    timestamp, message_id = raw.split("|", 1)
+    return datetime.fromisoformat(timestamp), PydanticObjectId(message_id)
+
+
+async def get_chat_history(bot_id: str, limit: int = 50, cursor: Optional[str] = None):
+    """
+    Returns one page of a bot's chat history, newest first. Pass the returned
+    `next_cursor` to fetch the following (older) page.
+    """
+    try:
+        query = {"bot_id": PydanticObjectId(bot_id)}
+        if cursor:
+            try:
+                timestamp, message_id = _decode_history_cursor(cursor)
+            except Exception:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query["$or"] = [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$lt": message_id}}
+            ]
+
+        messages = await ChatMessage.find(query).sort(
+            [("timestamp", DESCENDING), ("_id", DESCENDING)]
+        ).limit(limit + 1).to_list()
+
+        next_cursor = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_cursor = _encode_history_cursor(messages[-1])
+        return {"messages": messages, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching chat history: {str(e)}")
+
+
 async def handle_response(query: str, botId: str = None):
     try:
-        bot = await Bot.get(PydanticObjectId(botId))
+        # Bot settings rarely change; read them from the in-process cache
+        with timed("chat", "bot_lookup"):
+            bot = await bot_cache.get(botId)
         if not bot:
             return JSONResponse(status_code=404, content={"detail": "Bot not found!"})
-        context = await getGeminiRes.retrieve_context(query, botId)
-        # print(context)
-        geminiResponse = await getGeminiRes.generate_response_with_gemini(query, context, bot.systemPrompt, bot.language)  
-        chatMessage = {
-            "user_query": query,
-            "bot_response": geminiResponse,
-            "timestamp": datetime.now(timezone.utc)
-        }
-        
-        # Check if chat history exists for this bot
-        chat_history = await ChatHistory.find_one(ChatHistory.bot.id == bot.id)
-        # print("chat_history:", chat_history)
-
-        if chat_history:
-            chat_history.messages.append(chatMessage)
-            await chat_history.save()
-        else:
-            new_history = ChatHistory(bot=bot.id, messages=[chatMessage])
-            await new_history.insert()
+        with timed("chat", "query_embed"):
+            query_embedding = await embed_query(query)
+        with timed("chat", "answer_cache"):
+            geminiResponse = answer_cache.get(botId, query_embedding, bot.answerVersion)
+        if geminiResponse is None:
+            with timed("chat", "retrieve"):
+                context = await getGeminiRes.retrieve_context(query, botId, query_embedding=query_embedding)
+            geminiResponse = await getGeminiRes.generate_response_with_gemini(
+                query, context, bot.systemPrompt, bot.language, bot.contextTokenBudget
+            )  
+            answer_cache.put(botId, query, query_embedding, geminiResponse, bot.answerVersion)
+        await save_chat_message(bot, query, geminiResponse)
         
         return geminiResponse
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+
+async def stream_response(query: str, botId: str = None):
+    """
+    Streams the answer as Server-Sent Events. Each `data:` event carries a JSON-encoded
+    text chunk; a final `done` event closes the stream. The exchange is written to
+    the chat log after the stream has been sent.
+    """
+    try:
+        # Bot settings rarely change; read them from the in-process cache
+        with timed("chat", "bot_lookup"):
+            bot = await bot_cache.get(botId)
+        if not bot:
+            return JSONResponse(status_code=404, content={"detail": "Bot not found!"})
+        with timed("chat", "query_embed"):
+            query_embedding = await embed_query(query)
+        with timed("chat", "answer_cache"):
+            cached = answer_cache.get(botId, query_embedding, bot.answerVersion)
+        context = None
+        if cached is None:
+            with timed("chat", "retrieve"):
+                context = await getGeminiRes.retrieve_context(query, botId, query_embedding=query_embedding)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+    parts = []
+
+    async def event_stream():
+        try:
+            if cached is not None:
+                parts.append(cached)
+                yield f"data: {json.dumps(cached)}\n\n"
+            else:
+                async for text in getGeminiRes.stream_response_with_gemini(
+                    query, context, bot.systemPrompt, bot.language, bot.contextTokenBudget
+                ):
+                    parts.append(text)
+                    yield f"data: {json.dumps(text)}\n\n"
+                answer_cache.put(botId, query, query_embedding, "".join(parts).strip(), bot.answerVersion)
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            parts.clear()
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+    async def save_history():
+        if parts:
+            await save_chat_message(bot, query, "".join(parts).strip())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(save_history)
+    )
@@ -6,16 +6,14 @@ from pymongo.errors import DuplicateKeyError
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from utils import loginHelpers 
-from passlib.context import CryptContext
-
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from utils.executors import run_auth
+from utils.authCache import auth_cache
 
 
 async def create_user(user: User) -> User:
     try:
         # Check for existing user with same email (manual check + unique index recommended)
-        user.password = pwd_context.hash(user.password)
+        user.password = await run_auth(loginHelpers.get_password_hash, user.password)
         await user.insert()
         return user
 
@@ -35,7 +33,6 @@ async def get_all_users():
 
 async def get_user(user_id: str) -> User:
     try:
-        print("hello")
         user = await User.get(PydanticObjectId(user_id))
         if user is None:
             return JSONResponse(status_code=404, detail="User not found")
@@ -51,12 +48,24 @@ async def update_user(user_id: str, update_data: dict):
             return JSONResponse(status_code=404, content={"detail": "User not found!"})
 
         update_data = jsonable_encoder(update_data)
-
-        for field, value in update_data.items():
-            if hasattr(user, field):
-                setattr(user, field, value)
-
-        await user.save()
+        if "password" in update_data:
+            update_data["password"] = await run_auth(loginHelpers.get_password_hash, update_data["password"])
+        previous_email = user.email
+
+        changes = {
+            field: value for field, value in update_data.items()
+            if hasattr(user, field) and field not in ("id", "authVersion")
+        }
+        for field, value in changes.items():
+            setattr(user, field, value)
+
+        # The version bump tells other workers' auth caches to drop this user's tokens
+        update = {"$inc": {"authVersion": 1}}
+        if changes:
+            update["$set"] = changes
+        await User.get_motor_collection().update_one({"_id": user.id}, update)
+        user.authVersion += 1
+        auth_cache.invalidate_user(previous_email)
         return user
 
     except Exception as e:
@@ -70,6 +79,7 @@ async def delete_user(bot_id: str):
             return JSONResponse(status_code=404, content={"detail": "User not found!"})
         
         await bot.delete()
+        auth_cache.invalidate_user(bot.email)
         return JSONResponse(status_code=200, content={"detail": "User deleted successfully."})
     
     except Exception as e:
@@ -1,13 +1,52 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+from fastapi import FastAPI, Response
 from routers import userRouter, botRouter
 from utils.db import init_db
+from utils.embeddingModels import warmup_embedding_models
+from utils.embeddingScheduler import query_batcher, get_batch_stats
+from utils.executors import loop_lag_monitor, shutdown_executors
+from utils.answerCache import answer_cache
+from utils.authCache import auth_cache
+from utils.botCache import bot_cache
+from utils.embedPipeline import get_pipeline_stats
+from utils.ingestionJobs import ingestion_jobs
+from utils.clients import clients
+from utils.getGeminiRes import LLM_BACKEND
+from utils.vectorStore import VECTOR_STORE_BACKEND
+from utils.metrics import ServerTimingMiddleware, render_metrics
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
 
     
 app = FastAPI()
+# Per-stage timings as Server-Timing headers, request latency histograms on /metrics
+app.add_middleware(ServerTimingMiddleware)
 
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    clients.start(gemini=LLM_BACKEND == "gemini", pinecone=VECTOR_STORE_BACKEND == "pinecone")
+    # Load the embedding model once so chat requests never pay for it
+    await asyncio.to_thread(warmup_embedding_models)
+    loop_lag_monitor.start()
+    bot_cache.start()
+    auth_cache.start()
+    await ingestion_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await ingestion_jobs.stop()
+    await query_batcher.close()
+    await clients.close()
+    await loop_lag_monitor.stop()
+    await bot_cache.stop()
+    await auth_cache.stop()
+    shutdown_executors()
 
 
 
@@ -18,4 +57,20 @@ app.include_router(botRouter.router)
 # Optional root endpoint
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the FastAPI MongoDB User API"}
\ No newline at end of file
+    return {"message": "Welcome to the FastAPI MongoDB User API"}
+
+@app.get("/stats")
+def read_stats():
+    return {
+        "event_loop_lag": loop_lag_monitor.stats(),
+        "query_embedding_batches": get_batch_stats(),
+        "answer_cache": answer_cache.stats(),
+        "auth_cache": auth_cache.stats(),
+        "bot_cache": bot_cache.stats(),
+        "ingestion_pipeline": get_pipeline_stats()
+    }
+
+@app.get("/metrics")
+def read_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -2,6 +2,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from models.userModel import User
+from utils.authCache import auth_cache
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -16,6 +17,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Tokens verified recently resolve without decoding or a database round trip
+    user = auth_cache.get(token)
+    if user is not None:
+        return user
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -24,6 +29,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         user = await User.find_one({"email": email})
         if user is None:
             raise credentials_exception
+        auth_cache.put(token, user, payload.get("exp"))
         return user
     except JWTError:
         raise credentials_exception
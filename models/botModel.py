@@ -10,7 +10,9 @@ class Bot(Document):
     name: str = Field(..., description="Bot name")
     language: Optional[str] = Field("English", description="Description of the bot")
     systemPrompt: str = Field(..., description="System Prompt for the chatbot")
+    contextTokenBudget: Optional[int] = Field(None, gt=0, description="Max tokens of retrieved context per prompt (default: CONTEXT_TOKEN_BUDGET)")
     user: Link[User] = Field(..., description="Reference to the owner user")
+    answerVersion: int = Field(0, description="Bumped when the bot's settings or knowledge change; cached answers of older versions are ignored")
 
     class Settings:
         name = "bots"  # MongoDB collection name
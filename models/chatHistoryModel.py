@@ -1,11 +1,14 @@
-from beanie import Document, Link
+from beanie import Document, Link, PydanticObjectId
 from pydantic import Field
 from typing import Optional
+from datetime import datetime, timezone
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from models.botModel import Bot
 
 class ChatHistory(Document):
     """
-    Chat history document linked to a Bot.
+    Legacy chat history document linked to a Bot (one growing document per bot).
+    New messages are written to ChatMessage; this model is kept so existing data stays readable.
     """
     bot: Link[Bot] = Field(..., description="Reference to the bot associated with this chat history")
     messages: list[dict] = Field(..., description="List of messages in the chat history")
@@ -26,3 +29,32 @@ class ChatHistory(Document):
                 ]
             }
         }
+
+
+class ChatMessage(Document):
+    """
+    One chat exchange (user query + bot response), stored as its own document.
+    Appending is a single insert, so write cost does not grow with the bot's history.
+    """
+    bot_id: PydanticObjectId = Field(..., description="ID of the bot this message belongs to")
+    user_query: str = Field(..., description="Query sent by the user")
+    bot_response: str = Field(..., description="Response generated by the bot")
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="When the exchange happened")
+
+    class Settings:
+        name = "chat_messages"  # MongoDB collection name
+        indexes = [
+            IndexModel(
+                [("bot_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]
+            )
+        ]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "bot_id": "64f9a2b6e1f84a9c4c36c998",
+                "user_query": "What is the weather today?",
+                "bot_response": "The weather today is sunny with a high of 75°F.",
+                "timestamp": "2023-10-01T12:00:00Z"
+            }
+        }
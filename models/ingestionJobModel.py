@@ -0,0 +1,43 @@
+from beanie import Document
+from pydantic import Field
+from typing import Optional
+from datetime import datetime, timezone
+from pymongo import IndexModel, ASCENDING
+
+class IngestionJob(Document):
+    """
+    Background crawl/upload job. Persisted so status and progress survive a restart.
+    """
+    kind: str = Field(..., description="Job type: 'crawl' or 'upload'")
+    status: str = Field("queued", description="queued, running, completed, failed or cancelled")
+    params: dict = Field(default_factory=dict, description="Arguments needed to (re)run the job")
+    session_id: Optional[str] = Field(None, description="TempStorage session the chunks are staged under")
+    progress: dict = Field(default_factory=dict, description="Counters such as pages_crawled, chunks, bytes_parsed")
+    result: Optional[dict] = Field(None, description="Final result once the job completes")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    cancel_requested: bool = Field(False, description="Set when a client asks to cancel the job")
+    owner: Optional[str] = Field(None, description="Worker process that holds the job's lease")
+    heartbeat_at: Optional[datetime] = Field(None, description="Last lease renewal by the owner; stale leases are taken over")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="When the job was submitted")
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Last status or progress update")
+
+    class Settings:
+        name = "ingestion_jobs"  # MongoDB collection name
+        indexes = [
+            IndexModel([("status", ASCENDING), ("heartbeat_at", ASCENDING)]),
+            IndexModel([("owner", ASCENDING), ("status", ASCENDING)])
+        ]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "kind": "crawl",
+                "status": "running",
+                "params": {"url": "https://example.com", "max_depth": 3},
+                "session_id": "d224b4bc-d21b-4d73-84c2-cdcc4731b701",
+                "progress": {"pages_crawled": 12, "chunks": 140},
+                "result": None,
+                "error": None,
+                "cancel_requested": False
+            }
+        }
@@ -0,0 +1,39 @@
+from beanie import Document
+from pydantic import Field
+from typing import Optional
+from datetime import datetime, timezone
+from pymongo import IndexModel, ASCENDING
+
+class PageManifest(Document):
+    """
+    One crawled page of a bot's website knowledge: HTTP validators, content hash and the
+    vector ids its chunks were stored under. Used to re-embed only pages that changed.
+    """
+    bot_id: str = Field(..., description="ID of the bot the page belongs to")
+    url: str = Field(..., description="Normalized page URL")
+    etag: Optional[str] = Field(None, description="ETag returned by the server")
+    last_modified: Optional[str] = Field(None, description="Last-Modified returned by the server")
+    content_hash: str = Field(..., description="SHA-256 of the page markdown")
+    vector_ids: list[str] = Field(default_factory=list, description="Vector ids of the page's chunks")
+    links: list[str] = Field(default_factory=list, description="Internal links found on the page")
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="When the page was last checked")
+
+    class Settings:
+        name = "page_manifest"  # MongoDB collection name
+        indexes = [
+            IndexModel([("bot_id", ASCENDING), ("url", ASCENDING)], unique=True),
+            IndexModel([("bot_id", ASCENDING), ("vector_ids", ASCENDING)])
+        ]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "bot_id": "64f9a2b6e1f84a9c4c36c998",
+                "url": "https://example.com/docs/",
+                "etag": "\"5f3c-1a2b\"",
+                "last_modified": "Wed, 01 Oct 2025 12:00:00 GMT",
+                "content_hash": "9b74c9897bac770ffc029102a200c5de",
+                "vector_ids": ["64f9a2b6e1f84a9c4c36c998#0a1b2c3d"],
+                "links": ["https://example.com/docs/intro/"]
+            }
+        }
@@ -1,4 +1,5 @@
 from beanie import Document, Indexed
+from typing import Optional, Union
 from typing_extensions import Annotated
 from pydantic import Field
 from datetime import datetime, timezone
@@ -6,14 +7,16 @@ from pymongo import IndexModel, ASCENDING
 
 class TempStorage(Document):   
     """
-    Temporary storage for files and data.
-    Automatically expires 30 minutes after creation.
+    Temporary storage for ingested chunks, one document per chunk. A crawl session also
+    stages one document per page (`page` set, no `chunk`) from which the bot's page
+    manifest is built. Automatically expires 30 minutes after creation.
     """
-    session_id: str = Field(..., description="Unique session identifier")
-    dataChunks: list = Field(..., description="List of data chunks or files")
+    session_id: Annotated[str, Indexed()] = Field(..., description="Unique session identifier")
+    chunk: Optional[Union[str, dict]] = Field(None, description="Chunk text, or {'text': ..., **metadata}")
+    page: Optional[dict] = Field(None, description="Crawled page: url, etag, last_modified, content_hash, links")
     
     # TTL index set to expire documents 1800 seconds (30 minutes) after `created_at`
-    created_at: datetime = Field(default=datetime.now(timezone.utc), description="Timestamp of when the data was created")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Timestamp of when the data was created")
 
     class Settings:
         name = "temp_storage"  # MongoDB collection name
@@ -22,4 +25,4 @@ class TempStorage(Document):
                 [("created_at", ASCENDING)],
                 expireAfterSeconds=1800
             )
-        ]
\ No newline at end of file
+        ]
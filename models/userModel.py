@@ -11,6 +11,7 @@ class User(Document):
     name: str = Field(..., description="Full name of the user")
     email: Annotated[EmailStr, Indexed(unique=True)]
     password: str = Field(..., description="password of the user")
+    authVersion: int = Field(0, description="Bumped on every change; cached tokens of an older version are dropped")
 
     class Settings:
         name = "users"  # MongoDB collection name
@@ -7,8 +7,9 @@ from typing import Optional, List
 router = APIRouter(prefix="/bots", tags=["Bots"])
 
 @router.post("/", response_model=Bot)
-async def create_bot(bot: Bot):
-    return await botController.create_bot(bot)
+async def create_bot(bot: Bot,
+session_id: str = Query(..., description="session_id returned by the crawl/upload job")):
+    return await botController.create_bot(bot, session_id)
 
 @router.get("/{bot_id}", response_model=Bot)
 async def get_bot(bot_id: str):
@@ -19,6 +20,13 @@ async def list_bots(user_id: str):
     return await botController.get_all_bots_for_user(user_id)
 
 
+@router.get("/{bot_id}/history")
+async def get_chat_history(bot_id: str,
+limit: int = Query(50, ge=1, le=200, description="Messages per page"),
+cursor: Optional[str] = Query(None, description="next_cursor from the previous page")):
+    return await botController.get_chat_history(bot_id, limit=limit, cursor=cursor)
+
+
 @router.put("/{bot_id}", response_model=Bot)
 async def update_bot_endpoint(bot_id: str, update_data: dict = Body(...)):
     return await botController.update_bot(bot_id, update_data)
@@ -36,7 +44,19 @@ class CrawlRequest(BaseModel):
     
 @router.post("/crawl")
 async def crawl_endpoint(request: CrawlRequest):
-    return await botController.crawl_website_controller(
+    return await botController.submit_crawl_job(
+        url=request.url,
+        max_depth=request.max_depth,
+        max_concurrent=request.max_concurrent,
+        page_limit=request.page_limit
+    )
+
+
+
+@router.post("/{bot_id}/refresh")
+async def refresh_endpoint(bot_id: str, request: CrawlRequest):
+    return await botController.submit_refresh_job(
+        bot_id=bot_id,
         url=request.url,
         max_depth=request.max_depth,
         max_concurrent=request.max_concurrent,
@@ -49,7 +69,17 @@ async def crawl_endpoint(request: CrawlRequest):
 async def upload_files(
     files: List[UploadFile] = File(...)
 ):
-    return await botController.process_uploaded_files(files=files)
+    return await botController.submit_upload_job(files=files)
+
+
+@router.get("/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    return await botController.get_ingestion_job(job_id)
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_ingestion_job(job_id: str):
+    return await botController.cancel_ingestion_job(job_id)
 
 
 class QueryRequest(BaseModel):
@@ -58,4 +88,10 @@ class QueryRequest(BaseModel):
 @router.post("/response")
 async def generate_response( payload: QueryRequest, 
 bot_id: str = Query(..., description="Bot ID for metadata")):
-    return await botController.handle_response(query=payload.userQuery, botId=bot_id)
\ No newline at end of file
+    return await botController.handle_response(query=payload.userQuery, botId=bot_id)
+
+
+@router.post("/response/stream")
+async def generate_response_stream(payload: QueryRequest,
+bot_id: str = Query(..., description="Bot ID for metadata")):
+    return await botController.stream_response(query=payload.userQuery, botId=bot_id)
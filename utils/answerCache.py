@@ -0,0 +1,208 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+from beanie import PydanticObjectId
+from dotenv import load_dotenv
+from models.botModel import Bot
+from utils.botCache import bot_cache
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES_PER_BOT = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES_PER_BOT", "256"))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Rough per-entry bookkeeping cost on top of the vector and strings
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+class _BotCache:
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._created: Optional[np.ndarray] = None
+        self._keys: list = []
+
+    def matrix(self):
+        # Stacked embeddings are rebuilt only after the entry set changes
+        if self._matrix is None and self.entries:
+            self._keys = list(self.entries.keys())
+            self._matrix = np.stack([self.entries[k]["embedding"] for k in self._keys])
+            self._created = np.array([self.entries[k]["created_at"] for k in self._keys])
+        return self._matrix, self._keys
+
+    def expired_keys(self, ttl: float) -> list:
+        if not self.entries:
+            return []
+        self.matrix()
+        return [self._keys[i] for i in np.flatnonzero(time.monotonic() - self._created > ttl)]
+
+    def changed(self):
+        self._matrix = None
+
+
+class SemanticAnswerCache:
+    """
+    Per-bot cache of generated answers keyed on the query embedding. A lookup hits when
+    the cosine similarity between the new query and a cached query is at least
+    `threshold`. Entries expire after `ttl_seconds`; least recently used entries are
+    evicted when a bot exceeds `max_entries_per_bot` or the cache exceeds `max_bytes`.
+    Entries are tagged with the bot's `answerVersion`: a lookup with a newer version drops
+    the bot's entries, and an answer generated for an older version is not stored.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+                 max_entries_per_bot: int = ANSWER_CACHE_MAX_ENTRIES_PER_BOT,
+                 max_bytes: int = ANSWER_CACHE_MAX_BYTES,
+                 enabled: bool = ANSWER_CACHE_ENABLED):
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_entries_per_bot = max_entries_per_bot
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._bots: Dict[str, _BotCache] = {}
+        # Global LRU order across bots, used for the memory cap
+        self._lru: "OrderedDict[tuple, int]" = OrderedDict()
+        self._next_id = 0
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, botId: str, key: int):
+        bot_cache = self._bots.get(botId)
+        if bot_cache is None or key not in bot_cache.entries:
+            return
+        entry = bot_cache.entries.pop(key)
+        bot_cache.changed()
+        self._lru.pop((botId, key), None)
+        self.total_bytes -= entry["size"]
+        if not bot_cache.entries:
+            del self._bots[botId]
+
+    def _current(self, botId: str, version: int) -> Optional[_BotCache]:
+        bot_cache = self._bots.get(botId)
+        if bot_cache is not None and bot_cache.version < version:
+            # The bot changed (possibly on another worker): everything cached is stale
+            self.invalidate_bot(botId)
+            return None
+        return bot_cache
+
+    def get(self, botId: str, embedding, version: int = 0) -> Optional[str]:
+        if not self.enabled:
+            return None
+        bot_cache = self._current(botId, version)
+        if bot_cache is None or bot_cache.version != version:
+            self.misses += 1
+            return None
+
+        # Expired entries are dropped before scoring, so they can't hide a fresh match
+        for key in bot_cache.expired_keys(self.ttl):
+            self._remove(botId, key)
+            self.expirations += 1
+        if botId not in self._bots:
+            self.misses += 1
+            return None
+
+        matrix, keys = bot_cache.matrix()
+        scores = matrix @ self._normalize(embedding)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        key = keys[best]
+        entry = bot_cache.entries[key]
+        bot_cache.entries.move_to_end(key)
+        self._lru.move_to_end((botId, key))
+        self.hits += 1
+        return entry["answer"]
+
+    def put(self, botId: str, query: str, embedding, answer: str, version: int = 0):
+        if not self.enabled or not answer:
+            return
+        vector = self._normalize(embedding)
+        size = vector.nbytes + len(query.encode("utf-8")) + len(answer.encode("utf-8")) + _ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        bot_cache = self._current(botId, version)
+        if bot_cache is not None and bot_cache.version > version:
+            # Generated from settings/knowledge that changed while the answer was produced
+            return
+        bot_cache = self._bots.setdefault(botId, _BotCache(version))
+        key = self._next_id
+        self._next_id += 1
+        bot_cache.entries[key] = {
+            "query": query,
+            "embedding": vector,
+            "answer": answer,
+            "created_at": time.monotonic(),
+            "size": size,
+        }
+        bot_cache.changed()
+        self._lru[(botId, key)] = size
+        self.total_bytes += size
+
+        while len(bot_cache.entries) > self.max_entries_per_bot:
+            oldest = next(iter(bot_cache.entries))
+            self._remove(botId, oldest)
+            self.evictions += 1
+        while self.total_bytes > self.max_bytes and self._lru:
+            lru_bot, lru_key = next(iter(self._lru))
+            self._remove(lru_bot, lru_key)
+            self.evictions += 1
+
+    def invalidate_bot(self, botId: str):
+        bot_cache = self._bots.get(botId)
+        if bot_cache is None:
+            return
+        for key in list(bot_cache.entries.keys()):
+            self._remove(botId, key)
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "bots": len(self._bots),
+            "entries": len(self._lru),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+answer_cache = SemanticAnswerCache()
+
+
+async def invalidate_bot_answers(botId: str):
+    """
+    Call after a bot's prompt settings or knowledge change. Bumps `answerVersion` in
+    MongoDB so other workers drop their cached answers as soon as they read the new
+    version (on their next bot-cache refresh), and drops this worker's entries now.
+    """
+    await Bot.get_motor_collection().update_one(
+        {"_id": PydanticObjectId(botId)}, {"$inc": {"answerVersion": 1}}
+    )
+    bot_cache.invalidate(botId)
+    answer_cache.invalidate_bot(botId)
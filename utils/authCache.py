@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+from dotenv import load_dotenv
+from models.userModel import User
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+AUTH_CACHE_REVALIDATE_SECONDS = float(os.getenv("AUTH_CACHE_REVALIDATE_SECONDS", "5"))
+
+
+class AuthCache:
+    """
+    Maps verified bearer tokens to their user record so authenticated requests skip the
+    JWT decode and the MongoDB lookup. An entry lives until the token expires or
+    `ttl_seconds` pass, whichever is first; the least recently used entries are evicted
+    beyond `max_entries`. `invalidate_user` drops every token of a user changed or deleted
+    by this worker. Once started, a background check compares the cached users'
+    `authVersion` with MongoDB every `revalidate_seconds` (one query for all of them), so a
+    change made through another worker stops serving within that interval.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = AUTH_CACHE_TTL_SECONDS,
+                 enabled: bool = AUTH_CACHE_ENABLED,
+                 revalidate_seconds: float = AUTH_CACHE_REVALIDATE_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_email: Dict[str, Set[str]] = {}
+        self._revalidator: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def get(self, token: str):
+        if not self.enabled:
+            return None
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        user, expires_at = entry
+        if time.time() >= expires_at:
+            self._remove(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return user
+
+    def put(self, token: str, user, token_expires_at: Optional[float] = None):
+        if not self.enabled or self.max_entries <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        self._remove(token)
+        self._entries[token] = (user, expires_at)
+        self._tokens_by_email.setdefault(user.email, set()).add(token)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        email = entry[0].email
+        tokens = self._tokens_by_email.get(email)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_email[email]
+
+    def invalidate_user(self, email: str):
+        for token in list(self._tokens_by_email.get(email, ())):
+            self._remove(token)
+
+    async def revalidate(self):
+        """
+        Drops the tokens of every cached user whose record was deleted or whose authVersion
+        moved on since it was cached.
+        """
+        cached = {}
+        for user, _ in self._entries.values():
+            cached.setdefault(user.id, []).append(user)
+        if not cached:
+            return
+        current = {
+            doc["_id"]: doc.get("authVersion", 0)
+            async for doc in User.get_motor_collection().find(
+                {"_id": {"$in": list(cached)}}, {"authVersion": True}
+            )
+        }
+        for user_id, users in cached.items():
+            for user in users:
+                if current.get(user_id) != user.authVersion:
+                    self.revalidated += 1
+                    self.invalidate_user(user.email)
+
+    async def _revalidate_loop(self):
+        while True:
+            await asyncio.sleep(self.revalidate_seconds)
+            try:
+                await self.revalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Can't tell what changed: serve nothing stale
+                logger.warning("Auth cache revalidation failed, clearing it: %s", e)
+                self._entries.clear()
+                self._tokens_by_email.clear()
+
+    def start(self):
+        if self.enabled and self.revalidate_seconds > 0 and (self._revalidator is None or self._revalidator.done()):
+            self._revalidator = asyncio.get_running_loop().create_task(self._revalidate_loop())
+
+    async def stop(self):
+        if self._revalidator and not self._revalidator.done():
+            self._revalidator.cancel()
+            try:
+                await self._revalidator
+            except asyncio.CancelledError:
+                pass
+        self._revalidator = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "revalidated": self.revalidated
+        }
+
+
+auth_cache = AuthCache()
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from beanie import PydanticObjectId
+from dotenv import load_dotenv
+from models.botModel import Bot
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BOT_CACHE_ENABLED = os.getenv("BOT_CACHE_ENABLED", "true").lower() == "true"
+BOT_CACHE_TTL_SECONDS = float(os.getenv("BOT_CACHE_TTL_SECONDS", "300"))
+BOT_CACHE_MAX_ENTRIES = int(os.getenv("BOT_CACHE_MAX_ENTRIES", "1000"))
+BOT_CACHE_CHANGE_STREAM = os.getenv("BOT_CACHE_CHANGE_STREAM", "false").lower() == "true"
+
+
+class BotConfigCache:
+    """
+    TTL/LRU cache of Bot documents keyed by bot id, so chat requests don't read the bot
+    from MongoDB on every message. Concurrent misses for one bot share a single read.
+    `invalidate` is called by update_bot/delete_bot; with the change-stream watcher started
+    (replica sets only), changes made by other workers invalidate it too.
+    Otherwise other workers see a change within `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: float = BOT_CACHE_TTL_SECONDS,
+                 max_entries: int = BOT_CACHE_MAX_ENTRIES,
+                 enabled: bool = BOT_CACHE_ENABLED):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._loading: Dict[tuple, asyncio.Future] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, bot_id: str, fetch_links: bool = False) -> Optional[Bot]:
+        """
+        Returns the bot, or None if it doesn't exist. Missing bots are not cached.
+        """
+        if not self.enabled:
+            return await Bot.get(PydanticObjectId(bot_id), fetch_links=fetch_links)
+
+        key = (bot_id, fetch_links)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() < entry[1]:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            # Served by a read already in flight, so no extra database round trip
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            bot = await Bot.get(PydanticObjectId(bot_id), fetch_links=fetch_links)
+            # An invalidation during the read means the result may already be stale
+            if bot is not None and self._loading.get(key) is future:
+                self._put(key, bot)
+            future.set_result(bot)
+            return bot
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+
+    def _put(self, key: tuple, bot: Bot):
+        self._entries[key] = (bot, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, bot_id: str):
+        self.invalidations += 1
+        for fetch_links in (False, True):
+            self._entries.pop((bot_id, fetch_links), None)
+            self._loading.pop((bot_id, fetch_links), None)
+
+    async def _watch(self):
+        collection = Bot.get_motor_collection()
+        while True:
+            try:
+                async with collection.watch() as stream:
+                    async for change in stream:
+                        document_key = change.get("documentKey") or {}
+                        if "_id" in document_key:
+                            self.invalidate(str(document_key["_id"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The stream is gone (e.g. failover); anything cached may have missed changes
+                logger.warning("Bot change stream interrupted, clearing bot cache: %s", e)
+                self._entries.clear()
+                await asyncio.sleep(5)
+
+    def start(self, watch: bool = BOT_CACHE_CHANGE_STREAM):
+        if watch and self.enabled and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher and not self._watcher.done():
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+        self._watcher = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "change_stream": self._watcher is not None and not self._watcher.done()
+        }
+
+
+bot_cache = BotConfigCache()
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import re
+from typing import List, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHUNK_DEDUP_NEAR = os.getenv("CHUNK_DEDUP_NEAR", "false").lower() == "true"
+CHUNK_DEDUP_THRESHOLD = float(os.getenv("CHUNK_DEDUP_THRESHOLD", "0.9"))
+
+_SIMHASH_BITS = 64
+_SIMHASH_BANDS = 8
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_chunk(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _content_key(text: str) -> bytes:
+    return hashlib.sha1(normalize_chunk(text).encode("utf-8")).digest()
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    64-bit SimHash over word shingles. Similar texts differ in few bits.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    bits = (hashes[:, None] >> np.arange(_SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    return int(sum(1 << i for i in np.flatnonzero(votes > 0)))
+
+
+class ChunkDeduper:
+    """
+    Drops repeated chunks (nav bars, footers, cookie banners) before embedding, keeping the
+    first occurrence. Exact duplicates are matched on a hash of the normalized text; with
+    `near_duplicates`, chunks whose SimHash similarity (1 - hamming / 64) is at least
+    `threshold` are dropped too. State is kept between `filter` calls, so an ingestion
+    streamed in batches is deduplicated as a whole; `report` counts what was removed.
+    """
+
+    def __init__(self, near_duplicates: bool = CHUNK_DEDUP_NEAR, threshold: float = CHUNK_DEDUP_THRESHOLD):
+        self.near_duplicates = near_duplicates
+        self.max_distance = int((1 - threshold) * _SIMHASH_BITS)
+        # With max_distance < number of bands, near-duplicates share at least one identical band;
+        # for looser thresholds every kept chunk has to be compared
+        self.use_bands = self.max_distance < _SIMHASH_BANDS
+        self.report = {
+            "input_chunks": 0,
+            "exact_duplicates_removed": 0,
+            "near_duplicates_removed": 0,
+            "output_chunks": 0
+        }
+        self._seen = set()
+        self._buckets = [dict() for _ in range(_SIMHASH_BANDS)]
+        self._kept_hashes = []
+
+    def filter(self, chunks: List[str]) -> List[str]:
+        kept = []
+        for chunk in chunks:
+            self.report["input_chunks"] += 1
+            key = _content_key(chunk)
+            if key in self._seen:
+                self.report["exact_duplicates_removed"] += 1
+                continue
+            self._seen.add(key)
+            if self.near_duplicates and self._is_near_duplicate(chunk):
+                self.report["near_duplicates_removed"] += 1
+                continue
+            kept.append(chunk)
+        self.report["output_chunks"] += len(kept)
+        return kept
+
+    def _is_near_duplicate(self, chunk: str) -> bool:
+        band_bits = _SIMHASH_BITS // _SIMHASH_BANDS
+        band_mask = (1 << band_bits) - 1
+        fingerprint = simhash(chunk)
+        bands = [(fingerprint >> (b * band_bits)) & band_mask for b in range(_SIMHASH_BANDS)]
+        if self.use_bands:
+            candidates = set()
+            for b, band in enumerate(bands):
+                candidates.update(self._buckets[b].get(band, ()))
+        else:
+            candidates = range(len(self._kept_hashes))
+        if any(bin(fingerprint ^ self._kept_hashes[c]).count("1") <= self.max_distance for c in candidates):
+            return True
+        index = len(self._kept_hashes)
+        self._kept_hashes.append(fingerprint)
+        for b, band in enumerate(bands):
+            self._buckets[b].setdefault(band, []).append(index)
+        return False
+
+
+def dedupe_chunks(chunks: List[str], near_duplicates: bool = CHUNK_DEDUP_NEAR,
+                  threshold: float = CHUNK_DEDUP_THRESHOLD) -> Tuple[List[str], dict]:
+    """
+    One-shot ChunkDeduper: returns the kept chunks and a report of what was removed.
+    """
+    deduper = ChunkDeduper(near_duplicates, threshold)
+    kept = deduper.filter(chunks)
+    return kept, deduper.report
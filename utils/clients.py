@@ -0,0 +1,108 @@
+import asyncio
+import os
+from typing import Dict, Optional
+import httpx
+from google import genai
+from google.genai import types
+from pinecone import Pinecone, ServerlessSpec
+from dotenv import load_dotenv
+from utils.executors import run_io, IO_EXECUTOR_WORKERS
+
+load_dotenv()
+
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "20"))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+PINECONE_POOL_SIZE = int(os.getenv("PINECONE_POOL_SIZE", str(IO_EXECUTOR_WORKERS)))
+PINECONE_TIMEOUT_SECONDS = float(os.getenv("PINECONE_TIMEOUT_SECONDS", "10"))
+
+
+class ClientRegistry:
+    """
+    Process-wide API clients, created once at startup and closed at shutdown, so requests
+    reuse pooled keep-alive connections instead of paying for a new client and TLS
+    handshake each time. Clients are also created on first use for scripts that never
+    call start().
+    """
+
+    def __init__(self):
+        self._gemini: Optional[genai.Client] = None
+        self._gemini_http: Optional[httpx.Client] = None
+        self._gemini_async_http: Optional[httpx.AsyncClient] = None
+        self._pinecone: Optional[Pinecone] = None
+        self._pinecone_indexes: Dict[str, object] = {}
+        self._index_lock = asyncio.Lock()
+
+    def start(self, gemini: bool = True, pinecone: bool = True):
+        # Building the clients makes no network calls, connections open on first request
+        if gemini:
+            self.gemini()
+        if pinecone:
+            self.pinecone()
+
+    def gemini(self) -> genai.Client:
+        if self._gemini is None:
+            limits = httpx.Limits(
+                max_connections=GEMINI_POOL_SIZE,
+                max_keepalive_connections=GEMINI_POOL_SIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS
+            )
+            timeout = httpx.Timeout(GEMINI_TIMEOUT_SECONDS)
+            self._gemini_http = httpx.Client(limits=limits, timeout=timeout)
+            self._gemini_async_http = httpx.AsyncClient(limits=limits, timeout=timeout)
+            self._gemini = genai.Client(http_options=types.HttpOptions(
+                timeout=int(GEMINI_TIMEOUT_SECONDS * 1000),
+                httpx_client=self._gemini_http,
+                httpx_async_client=self._gemini_async_http
+            ))
+        return self._gemini
+
+    def pinecone(self) -> Pinecone:
+        if self._pinecone is None:
+            self._pinecone = Pinecone(
+                api_key=os.getenv("PINECONE_API_KEY"),
+                timeout=PINECONE_TIMEOUT_SECONDS,
+                connection_pool_maxsize=PINECONE_POOL_SIZE
+            )
+        return self._pinecone
+
+    async def pinecone_index(self, index_name: str, dimension: int = 1024, cloud: str = "aws",
+                             region: str = "us-east-1"):
+        """
+        Returns the cached handle for `index_name`, creating the index if it doesn't exist.
+        The control-plane lookup runs once per index per process, not on every ingestion.
+        """
+        index = self._pinecone_indexes.get(index_name)
+        if index is not None:
+            return index
+        async with self._index_lock:
+            if index_name not in self._pinecone_indexes:
+                pc = self.pinecone()
+                existing = await run_io(pc.list_indexes)
+                if index_name not in existing.names():
+                    await run_io(
+                        pc.create_index,
+                        name=index_name,
+                        dimension=dimension,
+                        metric="cosine",
+                        spec=ServerlessSpec(cloud=cloud, region=region)
+                    )
+                # Resolving the host is a control-plane call too
+                self._pinecone_indexes[index_name] = await run_io(pc.Index, index_name)
+        return self._pinecone_indexes[index_name]
+
+    async def close(self):
+        if self._gemini_async_http is not None:
+            await self._gemini_async_http.aclose()
+        if self._gemini_http is not None:
+            self._gemini_http.close()
+        for index in self._pinecone_indexes.values():
+            index.close()
+        if self._pinecone is not None:
+            self._pinecone.close()
+        self._gemini = self._gemini_http = self._gemini_async_http = None
+        self._pinecone = None
+        self._pinecone_indexes = {}
+
+
+clients = ClientRegistry()
@@ -1,22 +1,20 @@
+import logging
 import os
-from pathlib import Path
-from typing import List
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone, ServerlessSpec
-import uuid
+from bisect import bisect_right
+from typing import AsyncIterator, List, Tuple
 from dotenv import load_dotenv
+from utils.embeddingModels import get_embedding_model
+from utils.vectorStore import get_vector_store, make_vector_id
+from utils.clients import clients
+from utils.embedPipeline import embed_and_upsert_pipelined
+from utils.lexicalIndex import lexical_index
+from utils.answerCache import invalidate_bot_answers
+from utils.chunkDedup import ChunkDeduper
+from utils.metrics import timed
 
 load_dotenv()
 
-async def load_markdown_texts(directory: str = "crawlOutput") -> List[str]:
-    """
-    Loads all markdown files from a directory and returns their content as a list of strings.
-    """
-    texts = []
-    for file in Path(directory).glob("*.md"):
-        with open(file, 'r', encoding='utf-8') as f:
-            texts.append(f.read())
-    return texts
+logger = logging.getLogger(__name__)
 
 async def split_into_chunks(texts: List[str], chunk_size: int = 1500, overlap: int = 300) -> List[str]:
     """
@@ -33,47 +31,132 @@ async def split_into_chunks(texts: List[str], chunk_size: int = 1500, overlap: i
     return chunks
 
 
+async def split_pages_into_chunks(pages: AsyncIterator[Tuple[int, str]], chunk_size: int = 1500,
+                                  overlap: int = 300) -> AsyncIterator[dict]:
+    """
+    Streaming version of split_into_chunks for paged documents. Consumes (page_number, text)
+    pairs as they arrive and yields {"text", "page_start", "page_end"} chunks; only the
+    unfinished tail of the text is kept in memory.
+    """
+    step = chunk_size - overlap
+    buffer = ""
+    base = 0          # absolute offset of buffer[0]
+    position = 0      # absolute offset where the next chunk starts
+    page_offsets = []  # absolute offsets where pages start
+    page_numbers = []
+
+    def make_chunk(start: int) -> dict:
+        text = buffer[start - base:start - base + chunk_size]
+        last = start + len(text) - 1
+        return {
+            "text": text,
+            "page_start": page_numbers[bisect_right(page_offsets, start) - 1],
+            "page_end": page_numbers[bisect_right(page_offsets, last) - 1]
+        }
+
+    async for page_number, text in pages:
+        if not text:
+            continue
+        page_offsets.append(base + len(buffer))
+        page_numbers.append(page_number)
+        buffer += text + "\n"
+
+        while base + len(buffer) - position >= chunk_size:
+            yield make_chunk(position)
+            position += step
+
+        # Drop text no future chunk can reach
+        if position > base:
+            buffer = buffer[position - base:]
+            base = position
+            keep = max(0, bisect_right(page_offsets, base) - 1)
+            page_offsets = page_offsets[keep:]
+            page_numbers = page_numbers[keep:]
+
+    while position < base + len(buffer):
+        yield make_chunk(position)
+        position += step
 
-# Load embedding model
+
+
+# Load embedding model (shared process-wide, loaded once at startup)
 async def load_embedding_model():
-    return SentenceTransformer("all-MiniLM-L6-v2")  # Open-source, strong performance
+    return get_embedding_model()
 
-# Initialize Pinecone
+# Initialize Pinecone (shared client, index handle cached per process)
 async def init_pinecone(api_key: str, index_name: str, dimension: int = 1024, cloud="aws", region="us-east-1"):
-    pc = Pinecone(api_key=api_key)
+    return await clients.pinecone_index(index_name, dimension=dimension, cloud=cloud, region=region)
 
-    # Create index if it doesn't exist
-    if index_name not in pc.list_indexes().names():
-        pc.create_index(
-            name=index_name,
-            dimension=dimension,
-            metric="cosine",
-            spec=ServerlessSpec(cloud=cloud, region=region)
-        )
+# Embed and upsert chunks
+async def embed_and_push(chunks, botId=None, namespace=os.getenv("PINECONE_NAMESPACE"), on_written=None):
+    """
+    Deduplicates, embeds and upserts a bot's chunks, then adds them to its keyword index.
+    `chunks` is a list, or an async iterable of lists (e.g. iter_staged_chunks) that is
+    streamed through a single pipeline: duplicates are removed across the whole stream,
+    each upserted batch is added to the keyword index as it is written, and the answer
+    cache is invalidated once at the end. `await on_written(records)` is
+    called with each batch of (id, values, metadata) records once it is stored, so callers
+    learn which ids were actually written (chunks dropped as duplicates never are).
+    Returns the merged upsert report; callers must check `failed`.
+    """
+    deduper = ChunkDeduper()
+    vector_store = get_vector_store()
+    # Records waiting for their embedding
+    pending = {}
 
-    index = pc.Index(index_name)
-    return index
+    async def batches():
+        if hasattr(chunks, "__aiter__"):
+            async for batch in chunks:
+                yield batch
+        else:
+            yield chunks
 
-# Embed and upsert chunks
-async def embed_and_push(chunks, botId=None, namespace=os.getenv("PINECONE_NAMESPACE")):
-    model = await load_embedding_model()
-    print("Embedding model loaded.")
-    embeddings = model.encode(chunks, batch_size=32, show_progress_bar=True)
-    print("Embeddings generated for chunks.")
-    pinecone_index = await init_pinecone(
-        api_key=os.getenv("PINECONE_API_KEY"),
-        index_name=os.getenv("PINECONE_INDEX_NAME"),
-        dimension=384,
-        cloud="aws",          # or "gcp"
-        region="us-east-1"    # or your Pinecone dashboard region
-    )
-    print("Pinecone initialized.")
-    # Prepare records with unique IDs
-    to_upsert = [
-        (str(uuid.uuid4()), embedding.tolist(), {"text": chunk, "botId": botId})
-        for chunk, embedding in zip(chunks, embeddings)
-    ]
-
-    # Push to Pinecone
-    pinecone_index.upsert(vectors=to_upsert, namespace=namespace)
-    print(f"Upserted {len(to_upsert)} chunks to Pinecone.")
\ No newline at end of file
+    async def texts():
+        async for batch in batches():
+            # Chunks are plain strings or {"text": ..., **metadata} dicts (e.g. PDF page numbers)
+            extra_metadata = {}
+            batch_texts = []
+            for chunk in batch:
+                if isinstance(chunk, dict):
+                    text = chunk["text"]
+                    extra_metadata.setdefault(text, {k: v for k, v in chunk.items() if k != "text"})
+                else:
+                    text = chunk
+                batch_texts.append(text)
+            # Boilerplate repeated across pages is embedded and stored only once
+            with timed("ingest", "dedup"):
+                kept = deduper.filter(batch_texts)
+            for text in kept:
+                vector_id = make_vector_id(botId, text)
+                metadata = {**extra_metadata.get(text, {}), "text": text, "botId": botId}
+                pending[text] = (vector_id, metadata)
+                yield text
+
+    def make_record(text, embedding):
+        vector_id, metadata = pending.pop(text)
+        return vector_id, embedding, metadata
+
+    async def index_written(records):
+        # Same ids and metadata as the vectors, so keyword hits can be fused with vector hits;
+        # written per batch so no session-long copy of the texts is kept
+        with timed("ingest", "lexical_index"):
+            await lexical_index.add(botId, [vector_id for vector_id, _, _ in records],
+                                    [metadata for _, _, metadata in records], namespace=namespace)
+        if on_written is not None:
+            await on_written(records)
+
+    # Encoding and upserting overlap: the next batch is encoded while the previous one is written
+    report = await embed_and_upsert_pipelined(texts(), vector_store, make_record, namespace=namespace,
+                                              on_written=index_written)
+    report["botId"] = botId
+    report["dedup"] = deduper.report
+    if deduper.report["exact_duplicates_removed"] or deduper.report["near_duplicates_removed"]:
+        logger.info("Removed %d exact and %d near-duplicate chunks before embedding.",
+                    deduper.report["exact_duplicates_removed"], deduper.report["near_duplicates_removed"])
+    # Cached answers were generated from the old knowledge
+    await invalidate_bot_answers(botId)
+    logger.info("Upserted %d/%d chunks to the vector store (%d failed) for bot %s in %ss "
+                "(encode %s/s, upsert %s/s).", report["written"], report["total"], report["failed"], botId,
+                report["pipeline"]["wall_seconds"], report["pipeline"]["encode"]["items_per_second"],
+                report["pipeline"]["upsert"]["items_per_second"])
+    return report
@@ -0,0 +1,113 @@
+import os
+import re
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from utils.embeddingModels import get_embedding_model
+
+load_dotenv()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_MIN_OVERLAP_CHARS = int(os.getenv("CONTEXT_MIN_OVERLAP_CHARS", "40"))
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with the embedding model's tokenizer, which is already loaded in this
+    process. Gemini tokenizes differently, so treat counts as an estimate; they are close
+    enough to budget context and compare prompt sizes.
+    """
+    if not text:
+        return 0
+    tokenizer = getattr(get_embedding_model(), "tokenizer", None)
+    if tokenizer is None:
+        return len(_APPROX_TOKEN_RE.findall(text))
+    return len(tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"])
+
+
+def _overlap(first: str, second: str, min_chars: int) -> int:
+    """
+    Length of the longest suffix of `first` that is a prefix of `second` (0 if shorter
+    than `min_chars`). Neighbouring chunks of one document overlap this way.
+    """
+    if len(first) < min_chars or len(second) < min_chars:
+        return 0
+    probe = second[:min_chars]
+    start = max(0, len(first) - len(second))
+    while True:
+        start = first.find(probe, start)
+        if start == -1:
+            return 0
+        if second.startswith(first[start:]):
+            return len(first) - start
+        start += 1
+
+
+def build_context(chunks: List[str], token_budget: Optional[int] = None,
+                  min_overlap_chars: int = CONTEXT_MIN_OVERLAP_CHARS) -> Tuple[str, dict]:
+    """
+    Packs retrieved chunks, most relevant first, into at most `token_budget` tokens.
+    Text repeated between chunks is sent once: a chunk already contained in a selected
+    section is dropped, and a chunk that continues (or precedes) a selected section is
+    joined onto it without the overlapping span. A chunk that does not fit is skipped
+    so smaller, less relevant ones can still use the remaining budget.
+    Returns the context string and a report of what was kept and saved.
+    """
+    token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+    sections: List[str] = []
+    section_tokens: List[int] = []
+    used = 0
+    report = {
+        "chunks_in": len(chunks),
+        "chunks_used": 0,
+        "chunks_dropped_duplicate": 0,
+        "chunks_dropped_budget": 0,
+        "overlap_chars_trimmed": 0,
+        "raw_tokens": 0,
+        "token_budget": token_budget
+    }
+
+    for chunk in chunks:
+        tokens = count_tokens(chunk)
+        report["raw_tokens"] += tokens + (separator_tokens if report["raw_tokens"] else 0)
+
+        if any(chunk in section for section in sections):
+            report["chunks_dropped_duplicate"] += 1
+            continue
+
+        merged = None
+        for i, section in enumerate(sections):
+            after = _overlap(section, chunk, min_overlap_chars)
+            before = _overlap(chunk, section, min_overlap_chars) if not after else 0
+            if after or before:
+                text = section + chunk[after:] if after else chunk[:len(chunk) - before] + section
+                merged = (i, text, after or before)
+                break
+
+        if merged is not None:
+            i, text, trimmed = merged
+            text_tokens = count_tokens(text)
+            if used - section_tokens[i] + text_tokens > token_budget:
+                report["chunks_dropped_budget"] += 1
+                continue
+            used += text_tokens - section_tokens[i]
+            sections[i] = text
+            section_tokens[i] = text_tokens
+            report["overlap_chars_trimmed"] += trimmed
+        else:
+            cost = tokens + (separator_tokens if sections else 0)
+            if used + cost > token_budget:
+                report["chunks_dropped_budget"] += 1
+                continue
+            used += cost
+            sections.append(chunk)
+            section_tokens.append(tokens)
+        report["chunks_used"] += 1
+
+    context = CONTEXT_SEPARATOR.join(sections)
+    report["context_tokens"] = used
+    report["tokens_saved"] = max(0, report["raw_tokens"] - used)
+    return context, report
@@ -1,33 +1,29 @@
-import os
-from urllib.parse import urldefrag, urlparse
+import asyncio
+from urllib.parse import urldefrag
 from crawl4ai import (
     AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode,
     MemoryAdaptiveDispatcher
 )
 
-def create_output_directory():
-    if not os.path.exists('crawlOutput'):
-        os.makedirs('crawlOutput')
+def normalize_url(url):
+    return urldefrag(url)[0].rstrip('/') + '/'
 
-def get_safe_filename(url):
-    parsed = urlparse(url)
-    path = parsed.path.strip('/').replace('/', '_')
-    domain = parsed.netloc.replace('.', '_')
-    return f"crawlOutput/{domain}_{path or 'index'}.md"
-
-def save_content_to_file(url, content):
-    filename = get_safe_filename(url)
-    with open(filename, 'w', encoding='utf-8') as file:
-        file.write(content)
-
-async def crawl_recursive_batch(start_urls, max_depth=3, max_concurrent=10, page_limit=20):
-    create_output_directory()
+async def crawl_recursive_batch(start_urls, on_page, max_depth=3, max_concurrent=10, page_limit=20,
+                                skip_url=None):
+    """
+    Crawls start_urls breadth-first in streaming mode. Each successful page's markdown is
+    handed to `await on_page(url, markdown, links=..., headers=...)` as soon as it arrives;
+    nothing is written to disk, so concurrent crawls are fully isolated.
 
+    If `skip_url` is given, `await skip_url(url)` is asked before fetching a page. Returning a
+    list of links marks the page as unchanged: it is not fetched and those links are followed.
+    Returning None crawls the page normally.
+    """
     browser_config = BrowserConfig(headless=True, verbose=False)
     run_config = CrawlerRunConfig(
         cache_mode=CacheMode.BYPASS,
         exclude_external_links=True,
-        stream=False
+        stream=True
     )
     dispatcher = MemoryAdaptiveDispatcher(
         memory_threshold_percent=70.0,
@@ -38,10 +34,9 @@ async def crawl_recursive_batch(start_urls, max_depth=3, max_concurrent=10, page
     visited = set()
     pages_crawled = 0
     total_char_count = 0
-    saved_files = []
-
-    def normalize_url(url):
-        return urldefrag(url)[0].rstrip('/') + '/'
+    pages_saved = 0
+    pages_skipped = 0
+    gone_urls = []
 
     base_url = normalize_url(start_urls[0])
 
@@ -66,34 +61,67 @@ async def crawl_recursive_batch(start_urls, max_depth=3, max_concurrent=10, page
             remaining = page_limit - pages_crawled
             urls_to_crawl = urls_to_crawl[:remaining]
 
+            next_level_urls = set()
+
+            if skip_url is not None:
+                known_links = await asyncio.gather(*(skip_url(url) for url in urls_to_crawl))
+                fetch = []
+                for url, links in zip(urls_to_crawl, known_links):
+                    if links is None:
+                        fetch.append(url)
+                        continue
+                    visited.add(url)
+                    pages_crawled += 1
+                    pages_skipped += 1
+                    for link in links:
+                        next_url = normalize_url(link)
+                        if next_url not in visited and is_subpath_of_base(next_url):
+                            next_level_urls.add(next_url)
+                urls_to_crawl = fetch
+
+            if not urls_to_crawl:
+                current_urls = next_level_urls
+                continue
+
             results = await crawler.arun_many(
                 urls=urls_to_crawl,
                 config=run_config,
                 dispatcher=dispatcher
             )
 
-            next_level_urls = set()
-
-            for result in results:
+            async for result in results:
                 norm_url = normalize_url(result.url)
                 visited.add(norm_url)
                 pages_crawled += 1
 
                 if result.success:
-                    markdown_content = result.markdown or ""
+                    markdown_content = str(result.markdown or "")
                     total_char_count += len(markdown_content)
-                    save_content_to_file(result.url, markdown_content)
-                    saved_files.append(get_safe_filename(result.url))
-
-                    for link in result.links.get("internal", []):
-                        next_url = normalize_url(link["href"])
+                    internal_links = [link["href"] for link in result.links.get("internal", [])]
+                    if markdown_content:
+                        await on_page(
+                            result.url,
+                            markdown_content,
+                            links=internal_links,
+                            headers=getattr(result, "response_headers", None) or {}
+                        )
+                        pages_saved += 1
+
+                    for link in internal_links:
+                        next_url = normalize_url(link)
                         if next_url not in visited and is_subpath_of_base(next_url):
                             next_level_urls.add(next_url)
+                elif getattr(result, "status_code", None) in (404, 410):
+                    gone_urls.append(norm_url)
 
             current_urls = next_level_urls
 
     return {
         "pages_crawled": pages_crawled,
         "total_chars": total_char_count,
-        "saved_files": saved_files
+        "pages_saved": pages_saved,
+        "pages_skipped": pages_skipped,
+        "gone_urls": gone_urls,
+        # Pages may exist beyond what we reached (page_limit or max_depth stopped the crawl)
+        "truncated": pages_crawled >= page_limit or any(url not in visited for url in current_urls)
     }
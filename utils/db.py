@@ -1,3 +1,4 @@
+import logging
 import motor.motor_asyncio
 from beanie import init_beanie
 from dotenv import load_dotenv
@@ -5,19 +6,26 @@ import os
 
 from models.userModel import User
 from models.botModel import Bot  # include all document models here
-from models.chatHistoryModel import ChatHistory
+from models.chatHistoryModel import ChatHistory, ChatMessage
 from models.tempStorageModel import TempStorage
+from models.ingestionJobModel import IngestionJob
+from models.pageManifestModel import PageManifest
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
 
-async def init_db():
-    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
-    print("🔌 Initializing Beanie...")
+async def init_db(database=None):
+    # `database` lets tests and benchmarks pass a stand-in (e.g. mongomock) instead of MONGO_URI
+    if database is None:
+        client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+        database = client[DB_NAME]
+    logger.info("🔌 Initializing Beanie...")
     await init_beanie(
-        database=client[DB_NAME],
-        document_models=[User, Bot, ChatHistory, TempStorage]  # Add all models that extend Document
+        database=database,
+        document_models=[User, Bot, ChatHistory, ChatMessage, TempStorage, IngestionJob, PageManifest]  # Add all models that extend Document
     )
-    print("✅ Beanie initialized")
+    logger.info("✅ Beanie initialized")
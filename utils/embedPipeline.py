@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Union
+from dotenv import load_dotenv
+from utils.embeddingModels import get_embedding_model
+from utils.executors import run_embedding
+from utils.vectorStore import VectorStore, upsert_batched
+from utils.metrics import observe_stage
+
+load_dotenv()
+
+EMBED_PIPELINE_BATCH_SIZE = int(os.getenv("EMBED_PIPELINE_BATCH_SIZE", "128"))
+EMBED_PIPELINE_QUEUE_DEPTH = int(os.getenv("EMBED_PIPELINE_QUEUE_DEPTH", "2"))
+
+_DONE = object()
+
+
+class StageMetrics:
+    """
+    Counters for one pipeline stage. `busy_seconds` is time spent doing the stage's work,
+    `blocked_seconds` is time spent waiting on the neighbouring stage (an empty input queue
+    or a full output queue).
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+
+    def add(self, other: "StageMetrics"):
+        self.items += other.items
+        self.batches += other.batches
+        self.busy_seconds += other.busy_seconds
+        self.blocked_seconds += other.blocked_seconds
+
+    def stats(self) -> dict:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0.0
+        }
+
+
+class PipelineStats:
+    """
+    Totals across every pipeline run in this process, exposed on /stats.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.wall_seconds = 0.0
+        self.encode = StageMetrics()
+        self.upsert = StageMetrics()
+
+    def record(self, wall_seconds: float, encode: StageMetrics, upsert: StageMetrics):
+        self.runs += 1
+        self.wall_seconds += wall_seconds
+        self.encode.add(encode)
+        self.upsert.add(upsert)
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "encode": self.encode.stats(),
+            "upsert": self.upsert.stats()
+        }
+
+
+pipeline_stats = PipelineStats()
+
+
+async def _batched(texts: Union[Sequence[str], AsyncIterable[str]], batch_size: int) -> AsyncIterator[List[str]]:
+    if not hasattr(texts, "__aiter__"):
+        for start in range(0, len(texts), batch_size):
+            yield list(texts[start:start + batch_size])
+        return
+    batch = []
+    async for text in texts:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def embed_and_upsert_pipelined(texts: Union[Sequence[str], AsyncIterable[str]], vector_store: VectorStore,
+                                     make_record: Callable[[str, object], tuple],
+                                     namespace: Optional[str] = None,
+                                     batch_size: int = EMBED_PIPELINE_BATCH_SIZE,
+                                     queue_depth: int = EMBED_PIPELINE_QUEUE_DEPTH,
+                                     on_written: Optional[Callable[[list], Awaitable[None]]] = None) -> dict:
+    """
+    Encodes `texts` in batches of `batch_size` and feeds the records into one upsert_batched
+    stream as soon as they are encoded, so batch N+1 is encoded while batch N is being
+    written and upserts stay full-sized across encode batches. Encoded batches wait in a
+    queue of at most `queue_depth` entries: when uploads fall behind (max_in_flight upserts
+    pending), encoding pauses, so memory stays bounded regardless of corpus size. `texts` may be an async iterable (e.g. chunks streamed from a database cursor),
+    which is only read as fast as batches are encoded. `make_record(text, embedding)`
+    builds the (id, values, metadata) record; `on_written` is handed to upsert_batched and
+    receives each batch of records once it is stored.
+    Returns the merged upsert report plus per-stage metrics.
+    """
+    batch_size = max(1, batch_size)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_depth))
+    encode = StageMetrics()
+    upsert = StageMetrics()
+    report = {}
+    started = time.perf_counter()
+
+    async def encoder():
+        model = get_embedding_model()
+        async for batch in _batched(texts, batch_size):
+            t0 = time.perf_counter()
+            embeddings = await run_embedding(
+                model.encode, batch, batch_size=min(32, len(batch)), show_progress_bar=False
+            )
+            t1 = time.perf_counter()
+            observe_stage("ingest", "embed", t1 - t0)
+            await queue.put((batch, embeddings))
+            encode.busy_seconds += t1 - t0
+            encode.blocked_seconds += time.perf_counter() - t1
+            encode.items += len(batch)
+            encode.batches += 1
+        await queue.put(_DONE)
+
+    async def encoded_records():
+        while True:
+            t0 = time.perf_counter()
+            item = await queue.get()
+            upsert.blocked_seconds += time.perf_counter() - t0
+            if item is _DONE:
+                return
+            batch, embeddings = item
+            upsert.items += len(batch)
+            upsert.batches += 1
+            for text, embedding in zip(batch, embeddings):
+                yield make_record(text, embedding)
+
+    async def uploader():
+        # One upsert stream across all encoded batches: upserts stay full-sized and up to
+        # max_in_flight of them are pending while the next batches are encoded
+        t0 = time.perf_counter()
+        report.update(await upsert_batched(vector_store, encoded_records(), namespace=namespace,
+                                            on_written=on_written))
+        upsert.busy_seconds = time.perf_counter() - t0 - upsert.blocked_seconds
+        observe_stage("ingest", "upsert", upsert.busy_seconds)
+
+    encoder_task = asyncio.create_task(encoder())
+    uploader_task = asyncio.create_task(uploader())
+    try:
+        await asyncio.gather(encoder_task, uploader_task)
+    finally:
+        # A failure (or cancellation) in one stage stops the other
+        for task in (encoder_task, uploader_task):
+            task.cancel()
+
+    wall_seconds = time.perf_counter() - started
+    pipeline_stats.record(wall_seconds, encode, upsert)
+    report["pipeline"] = {
+        "batch_size": batch_size,
+        "queue_depth": queue.maxsize,
+        "wall_seconds": round(wall_seconds, 3),
+        "items_per_second": round(encode.items / wall_seconds, 1) if wall_seconds else 0.0,
+        "encode": encode.stats(),
+        "upsert": upsert.stats()
+    }
+    return report
+
+
+def get_pipeline_stats() -> dict:
+    return pipeline_stats.stats()
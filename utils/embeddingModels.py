@@ -0,0 +1,45 @@
+import logging
+import os
+import threading
+from typing import Dict
+from sentence_transformers import SentenceTransformer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+
+_models: Dict[str, SentenceTransformer] = {}
+_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: str = EMBEDDING_MODEL_NAME) -> SentenceTransformer:
+    """
+    Returns the process-wide SentenceTransformer for `model_name`, loading it on first use.
+    The model is loaded once and shared by ingestion and retrieval; encode() is safe to call
+    from concurrent requests since inference does not mutate the model.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have loaded it while we waited for the lock
+        model = _models.get(model_name)
+        if model is None:
+            model = SentenceTransformer(model_name)
+            _models[model_name] = model
+    return model
+
+
+def warmup_embedding_models(model_names=None):
+    """
+    Loads the configured embedding models and runs one dummy encode so the first
+    real request does not pay for weight loading or lazy kernel initialization.
+    """
+    for name in model_names or [EMBEDDING_MODEL_NAME]:
+        model = get_embedding_model(name)
+        model.encode(["warmup"])
+        logger.info("Embedding model '%s' loaded and warmed up.", name)
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from collections import Counter
+from dotenv import load_dotenv
+from utils.embeddingModels import get_embedding_model, EMBEDDING_MODEL_NAME
+from utils.executors import run_embedding
+
+load_dotenv()
+
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    """
+    Collects query embedding requests that arrive within a short window (or until
+    max_batch_size is reached), encodes them in a single model call and resolves
+    each caller's future with its own vector.
+    """
+
+    def __init__(self, max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+                 max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS,
+                 model_name: str = EMBEDDING_MODEL_NAME):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.model_name = model_name
+        self.batch_size_counts = Counter()
+        self.total_batches = 0
+        self.total_queries = 0
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str):
+        """
+        Returns the embedding (numpy vector) for a single text, batched with concurrent callers.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect_batch(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (e.g. client disconnected) don't need encoding
+        return [(text, fut) for text, fut in batch if not fut.done()]
+
+    async def _run(self):
+        model = get_embedding_model(self.model_name)
+        while True:
+            batch = await self._collect_batch()
+            if not batch:
+                continue
+
+            self.total_batches += 1
+            self.total_queries += len(batch)
+            self.batch_size_counts[len(batch)] += 1
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await run_embedding(model.encode, texts)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            for (_, fut), vector in zip(batch, vectors):
+                if not fut.done():
+                    fut.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "total_queries": self.total_queries,
+            "total_batches": self.total_batches,
+            "avg_batch_size": (self.total_queries / self.total_batches) if self.total_batches else 0.0,
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    async def close(self):
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+
+query_batcher = EmbeddingBatcher()
+
+
+async def embed_query(query: str):
+    return await query_batcher.embed(query)
+
+
+def get_batch_stats() -> dict:
+    return query_batcher.stats()
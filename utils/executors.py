@@ -0,0 +1,178 @@
+import asyncio
+import contextlib
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+IO_EXECUTOR_WORKERS = int(os.getenv("IO_EXECUTOR_WORKERS", "32"))
+EMBED_EXECUTOR_WORKERS = int(os.getenv("EMBED_EXECUTOR_WORKERS", "2"))
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", str(os.cpu_count() or 2)))
+AUTH_EXECUTOR_WORKERS = int(os.getenv("AUTH_EXECUTOR_WORKERS", str(min(2, os.cpu_count() or 2))))
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "500"))
+
+# Network SDK calls (Pinecone, Gemini): mostly waiting on sockets
+_io_executor = None
+# Embedding model inference: torch releases the GIL, and the model lives in this process
+_embed_executor = None
+# CPU-heavy pure-Python work (file parsing): separate processes avoid the GIL
+_cpu_executor = None
+# Password hashing (bcrypt): its own small pool, so logins never queue behind file parsing
+_auth_executor = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=IO_EXECUTOR_WORKERS, thread_name_prefix="io")
+    return _io_executor
+
+
+def get_embed_executor() -> ThreadPoolExecutor:
+    global _embed_executor
+    if _embed_executor is None:
+        _embed_executor = ThreadPoolExecutor(max_workers=EMBED_EXECUTOR_WORKERS, thread_name_prefix="embed")
+    return _embed_executor
+
+
+def _process_context():
+    # Never fork the server process: children would inherit its threads (locks held by the
+    # I/O pool, torch, the Mongo client) and can deadlock on them
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ProcessPoolExecutor(max_workers=CPU_EXECUTOR_WORKERS, mp_context=_process_context())
+    return _cpu_executor
+
+
+def get_auth_executor() -> ProcessPoolExecutor:
+    global _auth_executor
+    if _auth_executor is None:
+        _auth_executor = ProcessPoolExecutor(max_workers=max(1, AUTH_EXECUTOR_WORKERS), mp_context=_process_context())
+    return _auth_executor
+
+
+async def _run(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_io(func, *args, **kwargs):
+    """
+    Runs a blocking network/SDK call on the I/O thread pool.
+    """
+    return await _run(get_io_executor(), func, *args, **kwargs)
+
+
+async def run_embedding(func, *args, **kwargs):
+    """
+    Runs embedding model inference on the dedicated embedding thread pool.
+    """
+    return await _run(get_embed_executor(), func, *args, **kwargs)
+
+
+async def run_cpu(func, *args, **kwargs):
+    """
+    Runs CPU-bound work in the process pool. `func` and its arguments must be picklable
+    (module-level functions and plain data).
+    """
+    return await _run(get_cpu_executor(), func, *args, **kwargs)
+
+
+async def run_auth(func, *args, **kwargs):
+    """
+    Runs password hashing/verification in the dedicated auth process pool. Same pickling
+    rules as run_cpu.
+    """
+    return await _run(get_auth_executor(), func, *args, **kwargs)
+
+
+def shutdown_executors():
+    global _io_executor, _embed_executor, _cpu_executor, _auth_executor
+    for executor in (_io_executor, _embed_executor, _cpu_executor, _auth_executor):
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    _io_executor = _embed_executor = _cpu_executor = _auth_executor = None
+
+
+class ByteBudget:
+    """
+    Async limiter on the total size of work in flight. `async with budget.reserve(n)`
+    waits until n bytes fit under the limit; a single item larger than the limit is
+    admitted on its own so it can't block forever.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self._condition = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, size: int):
+        size = max(0, size)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_use == 0 or self.in_use + size <= self.limit)
+            self.in_use += size
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_use -= size
+                self._condition.notify_all()
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop responsiveness: sleeps for a fixed interval and records how
+    late the loop wakes up. Sustained lag means something is blocking the loop.
+    """
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.samples = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - start - self.interval) * 1000)
+            self.samples += 1
+            self.last_lag_ms = lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self.total_lag_ms += lag_ms
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+            "avg_lag_ms": round(self.total_lag_ms / self.samples, 3) if self.samples else 0.0,
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,38 @@
+import asyncio
+import os
+from typing import AsyncIterator
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "200"))
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "50"))
+
+
+class FakeLLM:
+    """
+    Offline stand-in for Gemini. Waits `latency_ms` before the first token and then emits
+    tokens at `tokens_per_second`, so streaming and latency can be tested without network.
+    """
+
+    def __init__(self, latency_ms: float = FAKE_LLM_LATENCY_MS,
+                 tokens_per_second: float = FAKE_LLM_TOKENS_PER_SECOND):
+        self.latency = latency_ms / 1000
+        self.token_interval = 1 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+    def _answer(self, prompt: str, user_query: str) -> str:
+        return f"This is a fake response to: {user_query}"
+
+    async def stream(self, prompt: str, user_query: str) -> AsyncIterator[str]:
+        await asyncio.sleep(self.latency)
+        words = self._answer(prompt, user_query).split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_interval)
+            yield word if i == 0 else " " + word
+
+    async def generate(self, prompt: str, user_query: str) -> str:
+        return "".join([token async for token in self.stream(prompt, user_query)])
+
+
+fake_llm = FakeLLM()
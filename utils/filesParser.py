@@ -1,7 +1,10 @@
+import logging
 from pathlib import Path
 from docx import Document
-import pandas as pd
 import PyPDF2
+from utils.tabularParser import is_tabular, iter_table_chunks
+
+logger = logging.getLogger(__name__)
 
 def extract_text_from_file(file_path: str, chunk_size: int = 20) -> str:
     ext = Path(file_path).suffix.lower()
@@ -12,31 +15,20 @@ def extract_text_from_file(file_path: str, chunk_size: int = 20) -> str:
                 return f.read()
 
         elif ext == ".pdf":
-            text = ""
             with open(file_path, "rb") as f:
                 reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-            return text
+                return "".join(page.extract_text() or "" for page in reader.pages)
 
         elif ext == ".docx":
             doc = Document(file_path)
             return "\n".join([p.text for p in doc.paragraphs])
 
-        elif ext == ".csv":
-            df = pd.read_csv(file_path)
-            header = ", ".join(df.columns)
-            chunks = []
-
-            for start in range(0, len(df), chunk_size):
-                chunk_df = df.iloc[start:start + chunk_size]
-                chunk_text = chunk_df.to_string(index=False, header=False)
-                chunks.append(f"{header}\n{chunk_text}")
-
-            return chunks
+        elif is_tabular(file_path):
+            # CSV/TSV/Excel/Parquet: one chunk per `chunk_size` rows
+            return [chunk for block in iter_table_chunks(file_path, chunk_size) for chunk in block]
 
         else:
             return ""
     except Exception as e:
-        print(f"Failed to extract text from {file_path}: {e}")
+        logger.warning("Failed to extract text from %s: %s", file_path, e)
         return ""
@@ -1,37 +1,106 @@
+import asyncio
+import logging
 import os
-from google import genai
+import time
 from google.genai import types
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
 from dotenv import load_dotenv
+from utils.embeddingModels import get_embedding_model
+from utils.embeddingScheduler import embed_query
+from utils.vectorStore import get_vector_store
+from utils.clients import clients
+from utils.fakeLLM import fake_llm
+from utils.lexicalIndex import lexical_index
+from utils.contextBuilder import build_context, count_tokens
+from utils.metrics import timed, observe_stage
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")  # "gemini" or "fake" for offline testing
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # "hybrid", "vector" or "lexical"
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+VECTOR_QUERY_TIMEOUT_SECONDS = float(os.getenv("VECTOR_QUERY_TIMEOUT_SECONDS", "2.0"))
+
 async def load_query_embedding_model():
-    return SentenceTransformer("all-MiniLM-L6-v2")
-
-
-async def retrieve_context(query, botId=None, namespace=os.getenv("PINECONE_NAMESPACE")):
-    model = await load_query_embedding_model()
-
-    query_embedding = model.encode([query])[0].tolist()
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-    pinecone_index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
-    results = pinecone_index.query(
-        vector=query_embedding,
-        top_k=5,
-        namespace=namespace,
-        include_metadata=True,
-        filter={"botId": {"$eq": botId}}
-        
-    )
-    context_chunks = [match['metadata']['text'] for match in results['matches']]
-    print(f"Retrieved {len(context_chunks)} context chunks for query: {query}")
+    return get_embedding_model()
+
+
+def fuse_ranked_results(result_lists, top_k: int, rrf_k: int = RRF_K):
+    """
+    Reciprocal-rank fusion: each match scores sum(1 / (rrf_k + rank)) over the lists it
+    appears in, so agreement between retrievers matters more than raw scores, which are
+    not comparable between BM25 and cosine similarity.
+    """
+    scores = {}
+    matches = {}
+    for results in result_lists:
+        for rank, match in enumerate(results, start=1):
+            scores[match["id"]] = scores.get(match["id"], 0.0) + 1.0 / (rrf_k + rank)
+            matches.setdefault(match["id"], match)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [{**matches[match_id], "score": scores[match_id]} for match_id in ranked]
+
+
+async def _vector_search(query, botId, namespace, query_embedding, top_k):
+    # Concurrent queries are micro-batched into a single encode call
+    if query_embedding is None:
+        with timed("chat", "query_embed"):
+            query_embedding = await embed_query(query)
+    with timed("chat", "vector_search"):
+        return await asyncio.wait_for(
+            get_vector_store().query(
+                vector=query_embedding,
+                top_k=top_k,
+                namespace=namespace,
+                filter={"botId": {"$eq": botId}}
+            ),
+            timeout=VECTOR_QUERY_TIMEOUT_SECONDS
+        )
+
+
+async def _lexical_search(query, botId, namespace, top_k):
+    with timed("chat", "lexical_search"):
+        return await lexical_index.search(query, botId, top_k=top_k, namespace=namespace)
+
+
+async def retrieve_context(query, botId=None, namespace=os.getenv("PINECONE_NAMESPACE"), query_embedding=None):
+    """
+    Returns the text of the best chunks for the query. In "hybrid" mode vector and BM25
+    results are fused; if the vector store errors or exceeds VECTOR_QUERY_TIMEOUT_SECONDS,
+    the keyword results are used on their own.
+    """
+    if RETRIEVAL_MODE == "lexical":
+        matches = await _lexical_search(query, botId, namespace, RETRIEVAL_TOP_K)
+    elif RETRIEVAL_MODE == "vector":
+        matches = await _vector_search(query, botId, namespace, query_embedding, RETRIEVAL_TOP_K)
+    else:
+        vector_results, lexical_results = await asyncio.gather(
+            _vector_search(query, botId, namespace, query_embedding, RETRIEVAL_CANDIDATES),
+            _lexical_search(query, botId, namespace, RETRIEVAL_CANDIDATES),
+            return_exceptions=True
+        )
+        if isinstance(lexical_results, BaseException):
+            logger.warning("Keyword search failed for bot %s: %s", botId, lexical_results)
+            lexical_results = []
+        if isinstance(vector_results, BaseException):
+            if not lexical_results:
+                raise vector_results
+            logger.warning("Vector search unavailable for bot %s (%s: %s), answering from keyword search only.",
+                           botId, type(vector_results).__name__, vector_results)
+            vector_results = []
+        matches = fuse_ranked_results([vector_results, lexical_results], RETRIEVAL_TOP_K)
+    context_chunks = [match['metadata']['text'] for match in matches]
+    logger.debug("Retrieved %d context chunks for query: %s", len(context_chunks), query)
     return context_chunks
 
-async def generate_response_with_gemini(user_query, context_chunks, systemPrompt, language):
-    client = genai.Client()
-    context_str = "\n\n---\n\n".join(context_chunks)
+def build_prompt(context_chunks, systemPrompt, language, token_budget=None):
+    # Overlapping chunks are joined and the context is cut to the bot's token budget
+    with timed("chat", "prompt_build"):
+        context_str, context_report = build_context(context_chunks, token_budget)
     prompt = f"""
             {systemPrompt}
             
@@ -43,9 +112,53 @@ async def generate_response_with_gemini(user_query, context_chunks, systemPrompt
             Context:
             {context_str}
             """
+    logger.info(
+        "Prompt: %d tokens, context %d/%d tokens from %d/%d chunks (%d tokens saved, "
+        "%d overlapping chars trimmed, %d duplicate and %d over-budget chunks dropped).",
+        count_tokens(prompt), context_report["context_tokens"], context_report["token_budget"],
+        context_report["chunks_used"], context_report["chunks_in"], context_report["tokens_saved"],
+        context_report["overlap_chars_trimmed"], context_report["chunks_dropped_duplicate"],
+        context_report["chunks_dropped_budget"]
+    )
+    logger.debug("Prompt text:\n%s", prompt)
+    return prompt
+
+async def generate_response_with_gemini(user_query, context_chunks, systemPrompt, language, token_budget=None):
+    prompt = build_prompt(context_chunks, systemPrompt, language, token_budget)
+    with timed("chat", "llm"):
+        if LLM_BACKEND == "fake":
+            return (await fake_llm.generate(prompt, user_query)).strip()
+
+        # Shared async client: pooled keep-alive connections, no worker thread per request
+        response = await clients.gemini().aio.models.generate_content(
+            model=GEMINI_MODEL,
+            config=types.GenerateContentConfig(system_instruction=prompt),
+            contents=user_query
+        )
+    return response.text.strip()
 
-    response = client.models.generate_content(model="gemini-2.0-flash", 
-                                        config=types.GenerateContentConfig(
-                                        system_instruction=prompt),
-                                        contents=user_query)
-    return response.text.strip()
\ No newline at end of file
+async def stream_response_with_gemini(user_query, context_chunks, systemPrompt, language, token_budget=None):
+    """
+    Yields response text chunks as Gemini produces them. Records time to first chunk
+    ("llm_first_token") and to the end of the stream ("llm").
+    """
+    prompt = build_prompt(context_chunks, systemPrompt, language, token_budget)
+    start = time.perf_counter()
+    first = True
+    if LLM_BACKEND == "fake":
+        stream = fake_llm.stream(prompt, user_query)
+    else:
+        stream = await clients.gemini().aio.models.generate_content_stream(
+            model=GEMINI_MODEL,
+            config=types.GenerateContentConfig(system_instruction=prompt),
+            contents=user_query
+        )
+    async for chunk in stream:
+        text = chunk if isinstance(chunk, str) else chunk.text
+        if not text:
+            continue
+        if first:
+            observe_stage("chat", "llm_first_token", time.perf_counter() - start)
+            first = False
+        yield text
+    observe_stage("chat", "llm", time.perf_counter() - start)
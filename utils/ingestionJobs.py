@@ -0,0 +1,314 @@
+import asyncio
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from beanie import PydanticObjectId
+from beanie.operators import Eq, In
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+from models.ingestionJobModel import IngestionJob
+from models.tempStorageModel import TempStorage
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", "100"))
+INGESTION_PROGRESS_INTERVAL_SECONDS = float(os.getenv("INGESTION_PROGRESS_INTERVAL_SECONDS", "1.0"))
+INGESTION_HEARTBEAT_SECONDS = float(os.getenv("INGESTION_HEARTBEAT_SECONDS", "10"))
+INGESTION_LEASE_SECONDS = float(os.getenv("INGESTION_LEASE_SECONDS", "60"))
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "rag-uploads"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.getenv("UPLOAD_MAX_INFLIGHT_BYTES", str(256 * 1024 * 1024)))
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+def job_spool_dir(job_id: str) -> str:
+    """
+    Private directory holding an upload job's files until the job has parsed them.
+    """
+    return os.path.join(UPLOAD_SPOOL_DIR, str(job_id))
+
+
+class JobProgress:
+    """
+    Progress reporter handed to job handlers. `await progress(pages_crawled=3, chunks=40)`
+    records counters; they are persisted at most every INGESTION_PROGRESS_INTERVAL_SECONDS.
+    Each save also renews the job's lease and reads back `cancel_requested`, so a cancel
+    made through any worker stops the handler at its next progress update.
+    """
+
+    def __init__(self, job: IngestionJob, interval: float = INGESTION_PROGRESS_INTERVAL_SECONDS):
+        self.job = job
+        self.interval = interval
+        self.stop_reason: Optional[str] = None
+        self._last_saved = 0.0
+
+    async def __call__(self, **counters):
+        self.job.progress.update(counters)
+        if time.monotonic() - self._last_saved >= self.interval:
+            await self.flush()
+
+    async def flush(self):
+        if await self.sync():
+            raise asyncio.CancelledError()
+
+    async def sync(self) -> Optional[str]:
+        """
+        Saves progress and renews the lease in one round trip. Returns "cancelled" once a
+        cancel was requested and "lease_lost" if another worker has taken the job over.
+        """
+        self._last_saved = time.monotonic()
+        now = datetime.now(timezone.utc)
+        self.job.updated_at = now
+        doc = await IngestionJob.get_motor_collection().find_one_and_update(
+            {"_id": self.job.id, "owner": self.job.owner, "status": "running"},
+            {"$set": {"progress": self.job.progress, "updated_at": now, "heartbeat_at": now}},
+            projection={"cancel_requested": True},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            self.stop_reason = "lease_lost"
+        elif doc.get("cancel_requested"):
+            self.stop_reason = self.stop_reason or "cancelled"
+        return self.stop_reason
+
+
+JobHandler = Callable[[IngestionJob, JobProgress], Awaitable[dict]]
+
+
+class IngestionJobManager:
+    """
+    Runs crawl/upload jobs on a bounded queue with a fixed number of worker tasks.
+    Job state lives in MongoDB. Every job is leased to one worker process (`owner`),
+    which renews `heartbeat_at` every INGESTION_HEARTBEAT_SECONDS; a job whose lease is
+    older than INGESTION_LEASE_SECONDS is taken over and restarted by a live worker.
+    Queued jobs are claimed atomically, so a job never runs in two places at once.
+    """
+
+    def __init__(self, workers: int = INGESTION_WORKERS, queue_size: int = INGESTION_QUEUE_SIZE):
+        self.worker_count = max(1, workers)
+        self.queue_size = queue_size
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._running: Dict[str, Tuple[asyncio.Task, JobProgress]] = {}
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        await self._recover()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+        # Release the leases so a live worker (or this one after a restart) resumes the jobs
+        # right away instead of waiting for them to go stale
+        try:
+            await IngestionJob.get_motor_collection().update_many(
+                {"owner": self.worker_id, "status": {"$in": ACTIVE_STATUSES}},
+                {"$set": {"heartbeat_at": None}}
+            )
+        except Exception as e:
+            logger.warning("Could not release ingestion job leases: %s", e)
+
+    async def submit(self, kind: str, params: dict, session_id: Optional[str] = None,
+                     job_id: Optional[PydanticObjectId] = None) -> IngestionJob:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown ingestion job kind: {kind}")
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="Ingestion workers are not running")
+        if self._queue.full():
+            raise HTTPException(status_code=503, detail="Ingestion queue is full, try again later")
+
+        job = IngestionJob(kind=kind, params=params, session_id=session_id,
+                           owner=self.worker_id, heartbeat_at=datetime.now(timezone.utc))
+        if job_id is not None:
+            job.id = job_id
+        await job.insert()
+        self._queue.put_nowait(str(job.id))
+        return job
+
+    async def get(self, job_id: str) -> Optional[IngestionJob]:
+        return await IngestionJob.get(PydanticObjectId(job_id))
+
+    async def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        Records the cancel in the database; the owning worker stops the job and cleans up.
+        A queued job is marked cancelled at once so clients see it, and is dropped by its
+        owner when dequeued. A running job stops at its owner's next progress update or
+        heartbeat (immediately if it runs in this process).
+        """
+        collection = IngestionJob.get_motor_collection()
+        oid = PydanticObjectId(job_id)
+        await collection.update_one(
+            {"_id": oid, "status": "queued"},
+            {"$set": {"status": "cancelled", "cancel_requested": True, "updated_at": datetime.now(timezone.utc)}}
+        )
+        await collection.update_one({"_id": oid, "status": "running"}, {"$set": {"cancel_requested": True}})
+        running = self._running.get(job_id)
+        if running is not None:
+            task, progress = running
+            progress.stop_reason = "cancelled"
+            task.cancel()
+        return await self.get(job_id)
+
+    async def _finish(self, job: IngestionJob, status: str, result: dict = None, error: str = None) -> bool:
+        # Guarded by the lease: a worker that lost the job must not overwrite the new owner's state
+        job.status = status
+        job.result = result
+        job.error = error
+        job.updated_at = datetime.now(timezone.utc)
+        outcome = await IngestionJob.get_motor_collection().update_one(
+            {"_id": job.id, "owner": self.worker_id},
+            {"$set": {
+                "status": status,
+                "result": result,
+                "error": error,
+                "progress": job.progress,
+                "updated_at": job.updated_at
+            }}
+        )
+        return outcome.matched_count > 0
+
+    async def _cleanup(self, job: IngestionJob):
+        # Drop partially staged chunks and any spooled upload files
+        if job.session_id:
+            await TempStorage.find(Eq(TempStorage.session_id, job.session_id)).delete()
+        shutil.rmtree(job_spool_dir(str(job.id)), ignore_errors=True)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(INGESTION_HEARTBEAT_SECONDS)
+            try:
+                await self._renew_leases()
+                await self._recover()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Ingestion job heartbeat failed: %s", e)
+
+    async def _renew_leases(self):
+        # Jobs waiting in this process's queue
+        await IngestionJob.get_motor_collection().update_many(
+            {"owner": self.worker_id, "status": "queued"},
+            {"$set": {"heartbeat_at": datetime.now(timezone.utc)}}
+        )
+        # Running jobs, even if their handler has not reported progress for a while
+        for job_id, (task, progress) in list(self._running.items()):
+            if await progress.sync():
+                task.cancel()
+
+    async def _recover(self):
+        """
+        Takes over jobs whose owner stopped renewing the lease (crashed, stopped or cut off
+        from the database) and restarts them from scratch in this process.
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=INGESTION_LEASE_SECONDS)
+        stale = await IngestionJob.find(
+            In(IngestionJob.status, ACTIVE_STATUSES),
+            {"$or": [{"heartbeat_at": None}, {"heartbeat_at": {"$lt": cutoff}}]}
+        ).to_list()
+        recovered = 0
+        for job in stale:
+            # Compare-and-swap on the old lease, so only one worker takes each job over
+            taken = await IngestionJob.get_motor_collection().update_one(
+                {"_id": job.id, "owner": job.owner, "heartbeat_at": job.heartbeat_at,
+                 "status": {"$in": ACTIVE_STATUSES}},
+                {"$set": {"owner": self.worker_id, "heartbeat_at": now, "status": "queued",
+                          "progress": {}, "updated_at": now}}
+            )
+            if not taken.modified_count:
+                continue
+            recovered += 1
+            job.owner, job.heartbeat_at, job.status, job.progress = self.worker_id, now, "queued", {}
+            if job.cancel_requested:
+                await self._finish(job, "cancelled")
+                await self._cleanup(job)
+                continue
+            if job.kind == "upload" and not os.path.isdir(job_spool_dir(str(job.id))):
+                await self._finish(job, "failed", error="Uploaded files were lost in a restart, please upload again")
+                await self._cleanup(job)
+                continue
+            # Restart from scratch: discard what the interrupted run had staged
+            if job.session_id:
+                await TempStorage.find(Eq(TempStorage.session_id, job.session_id)).delete()
+            await self._queue.put(str(job.id))
+        if recovered:
+            logger.info("Recovered %d unfinished ingestion jobs.", recovered)
+
+    async def _claim(self, job_id: str) -> Optional[IngestionJob]:
+        now = datetime.now(timezone.utc)
+        doc = await IngestionJob.get_motor_collection().find_one_and_update(
+            {"_id": PydanticObjectId(job_id), "owner": self.worker_id, "status": "queued", "cancel_requested": False},
+            {"$set": {"status": "running", "heartbeat_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+        return None if doc is None else IngestionJob.model_validate(doc)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Ingestion worker error for job %s: %s", job_id, e)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self._claim(job_id)
+        if job is None:
+            # Cancelled while queued here: this worker holds its files, so it cleans up
+            job = await self.get(job_id)
+            if job is not None and job.owner == self.worker_id and job.status == "cancelled":
+                await self._cleanup(job)
+            return
+
+        progress = JobProgress(job)
+        task = asyncio.create_task(self._handlers[job.kind](job, progress))
+        self._running[job_id] = (task, progress)
+        try:
+            result = await task
+            if await self._finish(job, "completed", result=result):
+                # Staged chunks stay for bot creation; spooled upload files are no longer needed
+                shutil.rmtree(job_spool_dir(job_id), ignore_errors=True)
+        except asyncio.CancelledError:
+            if progress.stop_reason is None:
+                raise  # worker shutdown, the job is resumed once its lease is released or stale
+            if progress.stop_reason == "lease_lost":
+                logger.warning("Ingestion job %s was taken over by another worker, stopping here.", job_id)
+                return
+            if await self._finish(job, "cancelled"):
+                await self._cleanup(job)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            if await self._finish(job, "failed", error=detail):
+                await self._cleanup(job)
+        finally:
+            self._running.pop(job_id, None)
+
+
+ingestion_jobs = IngestionJobManager()
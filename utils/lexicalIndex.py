@@ -0,0 +1,401 @@
+import contextlib
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+from utils.executors import run_io
+
+load_dotenv()
+
+LEXICAL_INDEX_ENABLED = os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "lexicalIndex")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+LEXICAL_INDEX_MERGE_GROWTH = float(os.getenv("LEXICAL_INDEX_MERGE_GROWTH", "0.25"))
+LEXICAL_INDEX_MERGE_MIN_DOCS = int(os.getenv("LEXICAL_INDEX_MERGE_MIN_DOCS", "1000"))
+
+DEFAULT_PARTITION = "_default"
+
+# Words plus joined identifiers such as "ERR_CONN-42", "v1.2.3" or "sku/123-a"
+_TOKEN_RE = re.compile(r"\w+(?:[-_.:/]\w+)*")
+_PART_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms. A joined identifier is kept whole (so product codes and error names
+    match exactly) and its parts are indexed as well.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART_RE.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class _BotIndex:
+    """
+    One bot's BM25 index in two segments. The main segment keeps documents (ids + metadata,
+    which holds the chunk text) in docs.json and postings CSR-style in postings.npz: the
+    postings of term t are doc_ids[offsets[t]:offsets[t + 1]] with term frequencies tfs[...].
+    Writes go to the delta segment: one line per added or deleted document appended to
+    delta.jsonl, with the added documents' postings held in memory, so a write costs
+    O(batch). Once the delta holds LEXICAL_INDEX_MERGE_GROWTH of the bot (and at least
+    LEXICAL_INDEX_MERGE_MIN_DOCS changes), it is merged into the main arrays and the files
+    are rewritten. Deleted documents count towards document frequencies until that merge.
+    The files are loaded on first use; callers hold `lock` around every call.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Guards this bot only, so other bots are searched and written concurrently
+        self.lock = threading.RLock()
+        self.loaded = False
+        self._clear()
+
+    def _clear(self):
+        self.ids: List[str] = []
+        self.metadata: List[dict] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.term_ids: Dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.float32)
+        self.lengths = np.zeros(0, dtype=np.float32)
+        self.length_norm = np.zeros(0, dtype=np.float32)
+        self.live = np.zeros(0, dtype=bool)
+        self.main_rows = 0
+        self.dead_rows = 0
+        self.delta_changes = 0
+        self.delta_postings: Dict[int, Tuple[List[int], List[float]]] = {}
+        self._delta_arrays: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self._load()
+            self.loaded = True
+
+    @property
+    def docs_file(self) -> Path:
+        return self.path / "docs.json"
+
+    @property
+    def postings_file(self) -> Path:
+        return self.path / "postings.npz"
+
+    @property
+    def delta_file(self) -> Path:
+        return self.path / "delta.jsonl"
+
+    def _load(self):
+        rebuild = False
+        if self.docs_file.exists():
+            with open(self.docs_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if self.postings_file.exists():
+                self.ids = data["ids"]
+                self.metadata = data["metadata"]
+                self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+                postings = np.load(self.postings_file)
+                self.term_ids = {term: t for t, term in enumerate(postings["terms"].tolist())}
+                self.offsets = postings["offsets"]
+                self.doc_ids = postings["doc_ids"]
+                self.tfs = postings["tfs"]
+                self.lengths = postings["lengths"]
+                self.live = np.ones(len(self.ids), dtype=bool)
+                self.main_rows = len(self.ids)
+                self._update_length_norm()
+            else:
+                # Interrupted merge: re-index the stored documents
+                self._index_documents(data["ids"], data["metadata"])
+                rebuild = True
+        if self.delta_file.exists():
+            self._replay_delta()
+        if rebuild:
+            self._merge()
+
+    def _replay_delta(self):
+        # Runs of added documents are indexed together; replaying a change twice is harmless
+        added_ids, added_metadata = [], []
+        with open(self.delta_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn last line of an interrupted write
+                if entry[0] == "+":
+                    added_ids.append(entry[1])
+                    added_metadata.append(entry[2])
+                    continue
+                self._index_documents(added_ids, added_metadata)
+                added_ids, added_metadata = [], []
+                self._remove_documents([entry[1]])
+        self._index_documents(added_ids, added_metadata)
+
+    def _append_delta(self, entries: list):
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.delta_file, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+
+    def _save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Old postings are dropped first: docs.json without postings.npz is re-indexed on load
+        if self.postings_file.exists():
+            self.postings_file.unlink()
+        with open(self.docs_file, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "metadata": self.metadata}, f)
+        np.savez(
+            self.postings_file,
+            terms=np.asarray(list(self.term_ids), dtype=str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            tfs=self.tfs,
+            lengths=self.lengths
+        )
+        # Only now is the delta part of the main segment
+        if self.delta_file.exists():
+            self.delta_file.unlink()
+
+    def _update_length_norm(self):
+        # The document-length part of the BM25 denominator, precomputed per document
+        avg_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+        avg_length = avg_length if avg_length > 0 else 1.0
+        self.length_norm = (BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / avg_length)).astype(np.float32)
+
+    def _set_postings(self, terms: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray):
+        order = np.argsort(terms, kind="stable")
+        self.offsets = np.zeros(len(self.term_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.term_ids)), out=self.offsets[1:])
+        self.doc_ids = doc_ids[order].astype(np.int32)
+        self.tfs = tfs[order].astype(np.float32)
+        self._update_length_norm()
+
+    def _posting_terms(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int64), np.diff(self.offsets))
+
+    def _postings(self, t: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Main postings (terms first seen in the delta have none) followed by delta postings
+        if t + 1 < len(self.offsets):
+            start, end = self.offsets[t], self.offsets[t + 1]
+            doc_ids, tfs = self.doc_ids[start:end], self.tfs[start:end]
+        else:
+            doc_ids, tfs = self.doc_ids[:0], self.tfs[:0]
+        if t not in self.delta_postings:
+            return doc_ids, tfs
+        if t not in self._delta_arrays:
+            delta_docs, delta_tfs = self.delta_postings[t]
+            self._delta_arrays[t] = (np.asarray(delta_docs, dtype=np.int32), np.asarray(delta_tfs, dtype=np.float32))
+        delta_docs, delta_tfs = self._delta_arrays[t]
+        return np.concatenate([doc_ids, delta_docs]), np.concatenate([tfs, delta_tfs])
+
+    def _index_documents(self, ids: List[str], metadata: List[dict]) -> int:
+        # Ids are content hashes, so a known id already has the same text indexed
+        new_lengths = []
+        for doc_id, meta in zip(ids, metadata):
+            if doc_id in self.id_to_row:
+                continue
+            row = len(self.ids)
+            self.id_to_row[doc_id] = row
+            self.ids.append(doc_id)
+            self.metadata.append(meta)
+            counts = Counter(tokenize(meta.get("text", "")))
+            new_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                t = self.term_ids.setdefault(term, len(self.term_ids))
+                delta_docs, delta_tfs = self.delta_postings.setdefault(t, ([], []))
+                delta_docs.append(row)
+                delta_tfs.append(tf)
+                self._delta_arrays.pop(t, None)
+        if new_lengths:
+            self.lengths = np.concatenate([self.lengths, np.asarray(new_lengths, dtype=np.float32)])
+            self.live = np.concatenate([self.live, np.ones(len(new_lengths), dtype=bool)])
+            self.delta_changes += len(new_lengths)
+            self._update_length_norm()
+        return len(new_lengths)
+
+    def _remove_documents(self, ids: List[str]):
+        rows = [self.id_to_row.pop(doc_id) for doc_id in ids if doc_id in self.id_to_row]
+        self.live[rows] = False
+        self.dead_rows += len(rows)
+        self.delta_changes += len(rows)
+
+    def _maybe_merge(self):
+        if self.delta_changes >= max(LEXICAL_INDEX_MERGE_MIN_DOCS, LEXICAL_INDEX_MERGE_GROWTH * self.main_rows):
+            self._merge()
+
+    def _merge(self):
+        # Fold the delta postings into the CSR arrays and drop deleted documents
+        delta_terms, delta_docs, delta_tfs = [], [], []
+        for t, (docs, tfs) in self.delta_postings.items():
+            delta_terms.extend([t] * len(docs))
+            delta_docs.extend(docs)
+            delta_tfs.extend(tfs)
+        terms = np.concatenate([self._posting_terms(), np.asarray(delta_terms, dtype=np.int64)])
+        doc_ids = np.concatenate([self.doc_ids.astype(np.int64), np.asarray(delta_docs, dtype=np.int64)])
+        tfs = np.concatenate([self.tfs, np.asarray(delta_tfs, dtype=np.float32)])
+
+        keep = self.live
+        new_row = np.cumsum(keep) - 1
+        posting_keep = keep[doc_ids]
+        self.ids = [doc_id for doc_id, kept in zip(self.ids, keep) if kept]
+        self.metadata = [meta for meta, kept in zip(self.metadata, keep) if kept]
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.lengths = self.lengths[keep]
+        self.live = np.ones(len(self.ids), dtype=bool)
+        # Terms that lose all their postings stay in the vocabulary with an empty list
+        self._set_postings(terms[posting_keep], new_row[doc_ids[posting_keep]], tfs[posting_keep])
+        self.main_rows = len(self.ids)
+        self.dead_rows = 0
+        self.delta_changes = 0
+        self.delta_postings = {}
+        self._delta_arrays = {}
+        self._save()
+
+    def add(self, ids: List[str], metadata: List[dict]):
+        self._ensure_loaded()
+        added = self._index_documents(ids, metadata)
+        if not added:
+            return
+        self._append_delta([["+", doc_id, meta] for doc_id, meta in zip(self.ids[-added:], self.metadata[-added:])])
+        self._maybe_merge()
+
+    def delete(self, ids: List[str]):
+        self._ensure_loaded()
+        present = [doc_id for doc_id in set(ids) if doc_id in self.id_to_row]
+        if not present:
+            return
+        if len(present) == len(self.id_to_row):
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._clear()
+            return
+        self._remove_documents(present)
+        self._append_delta([["-", doc_id] for doc_id in present])
+        self._maybe_merge()
+
+    def search(self, query: str, top_k: int) -> List[dict]:
+        self._ensure_loaded()
+        if not self.id_to_row:
+            return []
+        terms = {self.term_ids[term] for term in tokenize(query) if term in self.term_ids}
+        if not terms:
+            return []
+
+        n_docs = len(self.ids)
+        docs, weights = [], []
+        for t in terms:
+            postings, tf = self._postings(t)
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            docs.append(postings)
+            weights.append(idf * tf * (BM25_K1 + 1) / (tf + self.length_norm[postings]))
+
+        if len(docs) == 1:
+            candidates, scores = docs[0], weights[0]
+        else:
+            candidates, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(weights))
+        if self.dead_rows:
+            alive = self.live[candidates]
+            candidates, scores = candidates[alive], scores[alive]
+        if not len(scores):
+            return []
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": self.ids[candidates[i]], "score": float(scores[i]), "metadata": self.metadata[candidates[i]]}
+            for i in top
+        ]
+
+
+class LexicalIndexStore:
+    """
+    Per-bot BM25 indexes under `base_dir/<namespace>/<botId>/`, loaded on first use.
+    Matches use the vector store format ({"id", "score", "metadata"}) and the same ids,
+    so results from both can be fused.
+    """
+
+    def __init__(self, base_dir: str = LEXICAL_INDEX_DIR, enabled: bool = LEXICAL_INDEX_ENABLED):
+        self.base_dir = Path(base_dir)
+        self.enabled = enabled
+        self._indexes: Dict[tuple, _BotIndex] = {}
+        # Only guards `_indexes`; each bot's index has its own lock
+        self._lock = threading.Lock()
+
+    def _bot_dir(self, namespace: Optional[str], botId: Optional[str]) -> Path:
+        return self.base_dir / (namespace or DEFAULT_PARTITION) / (botId or DEFAULT_PARTITION)
+
+    def _index(self, namespace: Optional[str], botId: Optional[str]) -> _BotIndex:
+        key = (namespace or DEFAULT_PARTITION, botId or DEFAULT_PARTITION)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                # Cheap: the files are only read on first use, under the bot's own lock
+                index = _BotIndex(self._bot_dir(namespace, botId))
+                self._indexes[key] = index
+        return index
+
+    def _search_sync(self, query: str, botId: str, top_k: int, namespace: Optional[str]) -> List[dict]:
+        index = self._index(namespace, botId)
+        with index.lock:
+            return index.search(query, top_k)
+
+    async def add(self, botId: str, ids: List[str], metadata: List[dict], namespace: Optional[str] = None):
+        if not self.enabled or not ids:
+            return
+
+        def write():
+            index = self._index(namespace, botId)
+            with index.lock:
+                index.add(ids, metadata)
+
+        await run_io(write)
+
+    async def delete(self, ids: List[str], botId: str, namespace: Optional[str] = None):
+        if not self.enabled or not ids:
+            return
+
+        def remove():
+            index = self._index(namespace, botId)
+            with index.lock:
+                index.delete(ids)
+
+        await run_io(remove)
+
+    async def delete_bot(self, botId: str, namespace: Optional[str] = None):
+        def remove():
+            with self._lock:
+                index = self._indexes.pop((namespace or DEFAULT_PARTITION, botId or DEFAULT_PARTITION), None)
+            # Waits for a write to this bot that is still running, then drops its files
+            with index.lock if index is not None else contextlib.nullcontext():
+                shutil.rmtree(self._bot_dir(namespace, botId), ignore_errors=True)
+
+        await run_io(remove)
+
+    async def search(self, query: str, botId: str, top_k: int = 5, namespace: Optional[str] = None) -> List[dict]:
+        if not self.enabled:
+            return []
+        with self._lock:
+            index = self._indexes.get((namespace or DEFAULT_PARTITION, botId or DEFAULT_PARTITION))
+        # A warm search only slices a few posting lists, run it inline unless a write to this
+        # bot holds its lock
+        if index is not None and index.loaded and index.lock.acquire(blocking=False):
+            try:
+                return index.search(query, top_k)
+            finally:
+                index.lock.release()
+        # Loading from disk is slow, keep it off the event loop
+        return await run_io(self._search_sync, query, botId, top_k, namespace)
+
+
+lexical_index = LexicalIndexStore()
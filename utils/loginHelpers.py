@@ -5,20 +5,30 @@ import os
 from models.userModel import User
 from jose import JWTError, jwt
 from dotenv import load_dotenv
+from utils.executors import run_auth
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a lower cost factor are upgraded on the next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                           bcrypt__rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password, hashed_password):
+    """
+    Returns (valid, new_hash); new_hash is set when the stored hash used a lower cost.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
@@ -31,11 +41,15 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
 
 async def authenticate_user(email: str, password: str):
-    print("Secret Key:", SECRET_KEY )
     user_data = await User.find_one({"email": email})
     if not user_data:
         return None
-    if not verify_password(password, user_data.password):
+    # bcrypt is deliberately slow; run it in the auth process pool
+    valid, new_hash = await run_auth(verify_and_update_password, password, user_data.password)
+    if not valid:
         return None
+    if new_hash:
+        user_data.password = new_hash
+        await user_data.set({User.password: new_hash})
     return user_data
 
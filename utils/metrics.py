@@ -0,0 +1,117 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+from prometheus_client import Histogram, generate_latest, CONTENT_TYPE_LATEST
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each stage of chat and ingestion pipelines",
+    ["pipeline", "stage"],
+    buckets=_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "rag_http_request_duration_seconds",
+    "HTTP request latency until the response body is complete",
+    ["method", "route", "status"],
+    buckets=_BUCKETS
+)
+
+# Stage timings of the current HTTP request, shared with the tasks it spawns
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = \
+    contextvars.ContextVar("request_timings", default=None)
+_stage_children = {}
+
+
+def observe_stage(pipeline: str, stage: str, seconds: float):
+    """
+    Records one stage duration in the histogram and, inside a request, for its
+    Server-Timing header.
+    """
+    if METRICS_ENABLED:
+        child = _stage_children.get((pipeline, stage))
+        if child is None:
+            child = _stage_children[(pipeline, stage)] = STAGE_SECONDS.labels(pipeline, stage)
+        child.observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timed(pipeline: str, stage: str):
+    """
+    `with timed("chat", "llm"): ...` times the block, including any awaits inside it.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(pipeline, stage, time.perf_counter() - start)
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total_seconds: float) -> str:
+    # Repeated stages (e.g. one per batch) are summed; durations are in milliseconds
+    totals = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that collects the stage timings recorded while a request is handled
+    and sends them as a Server-Timing header, then records the request latency. For
+    streamed responses the header only covers stages finished before the first byte;
+    later stages still reach /metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    header = server_timing_header(timings, time.perf_counter() - start)
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            if METRICS_ENABLED:
+                route = scope.get("route")
+                # Route templates keep label cardinality bounded (no raw ids in paths)
+                route_path = getattr(route, "path", "unmatched")
+                REQUEST_SECONDS.labels(scope["method"], route_path, str(status)).observe(
+                    time.perf_counter() - start
+                )
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
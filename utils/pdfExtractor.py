@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+from collections import deque
+from typing import AsyncIterator, List, Tuple
+import PyPDF2
+from dotenv import load_dotenv
+from utils.executors import run_cpu, CPU_EXECUTOR_WORKERS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+PDF_PAGE_TIMEOUT_SECONDS = int(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "30"))
+PDF_MAX_INFLIGHT_TASKS = int(os.getenv("PDF_MAX_INFLIGHT_TASKS", str(CPU_EXECUTOR_WORKERS * 2)))
+
+
+class _PageTimeout(BaseException):
+    # Not an Exception: PyPDF2 catches and swallows broad exceptions inside page parsing,
+    # which would turn the alarm into garbage text instead of a skipped page
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise _PageTimeout()
+
+
+def count_pdf_pages(file_path: str) -> int:
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        # PdfReader already tried the empty password; anything else cannot be read
+        if reader.is_encrypted and not reader.decrypt(""):
+            raise ValueError("the PDF is password protected")
+        return len(reader.pages)
+
+
+def extract_pdf_page_range(file_path: str, start: int, end: int,
+                           page_timeout: int = PDF_PAGE_TIMEOUT_SECONDS) -> List[Tuple[int, str]]:
+    """
+    Runs in a worker process: extracts pages [start, end) and returns (page_number, text)
+    pairs with 1-based page numbers. A page that takes longer than `page_timeout` seconds
+    is returned as empty text instead of stalling the job (SIGALRM, so only enforced on
+    platforms that have it).
+    """
+    use_alarm = (
+        page_timeout > 0
+        and hasattr(signal, "SIGALRM")
+        and threading.current_thread() is threading.main_thread()
+    )
+    previous_handler = signal.signal(signal.SIGALRM, _raise_timeout) if use_alarm else None
+    pages = []
+    try:
+        with open(file_path, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            for page_index in range(start, min(end, len(reader.pages))):
+                if use_alarm:
+                    signal.alarm(page_timeout)
+                try:
+                    text = reader.pages[page_index].extract_text() or ""
+                except _PageTimeout:
+                    logger.warning("Page %d of %s timed out after %ss, skipping.", page_index + 1, file_path, page_timeout)
+                    text = ""
+                except Exception as e:
+                    logger.warning("Failed to extract page %d of %s: %s", page_index + 1, file_path, e)
+                    text = ""
+                finally:
+                    if use_alarm:
+                        signal.alarm(0)
+                pages.append((page_index + 1, text))
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous_handler)
+    return pages
+
+
+async def iter_pdf_pages(file_path: str, pages_per_task: int = PDF_PAGES_PER_TASK,
+                         max_inflight: int = PDF_MAX_INFLIGHT_TASKS) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) in page order while page ranges are extracted in parallel on
+    the process pool. At most `max_inflight` ranges are pending, so memory stays bounded.
+    A corrupt or password-protected PDF is logged and yields no pages.
+    """
+    try:
+        page_count = await run_cpu(count_pdf_pages, file_path)
+    except Exception as e:
+        logger.warning("Skipping unreadable PDF %s: %s", os.path.basename(file_path), e)
+        return
+    ranges = deque(range(0, page_count, max(1, pages_per_task)))
+    pending = deque()
+
+    def submit_next():
+        start = ranges.popleft()
+        pending.append(asyncio.ensure_future(
+            run_cpu(extract_pdf_page_range, file_path, start, start + pages_per_task)
+        ))
+
+    try:
+        while ranges and len(pending) < max(1, max_inflight):
+            submit_next()
+        while pending:
+            pages = await pending.popleft()
+            if ranges:
+                submit_next()
+            for page in pages:
+                yield page
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,48 @@
+import hashlib
+import os
+import urllib.error
+import urllib.request
+from typing import Optional
+from dotenv import load_dotenv
+from utils.executors import run_io
+
+load_dotenv()
+
+RECRAWL_REQUEST_TIMEOUT_SECONDS = float(os.getenv("RECRAWL_REQUEST_TIMEOUT_SECONDS", "10"))
+
+
+def content_hash(markdown: str) -> str:
+    # Whitespace-only differences (re-rendered layout) don't count as a change
+    normalized = " ".join(markdown.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def validators_from_headers(headers: Optional[dict]):
+    headers = {str(k).lower(): v for k, v in (headers or {}).items()}
+    return headers.get("etag"), headers.get("last-modified")
+
+
+def _conditional_get(url: str, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    request_headers = {}
+    if etag:
+        request_headers["If-None-Match"] = etag
+    if last_modified:
+        request_headers["If-Modified-Since"] = last_modified
+    request = urllib.request.Request(url, headers=request_headers, method="GET")
+    try:
+        with urllib.request.urlopen(request, timeout=RECRAWL_REQUEST_TIMEOUT_SECONDS) as response:
+            return response.status == 304
+    except urllib.error.HTTPError as e:
+        return e.code == 304
+    except Exception:
+        # Unreachable or timed out: let the crawler fetch it and decide
+        return False
+
+
+async def is_unchanged(url: str, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """
+    Sends a conditional request with the stored validators. True only on 304 Not Modified.
+    """
+    if not etag and not last_modified:
+        return False
+    return await run_io(_conditional_get, url, etag, last_modified)
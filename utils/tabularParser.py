@@ -0,0 +1,100 @@
+import os
+from pathlib import Path
+from typing import Iterator, List
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TABULAR_ROWS_PER_CHUNK = int(os.getenv("TABULAR_ROWS_PER_CHUNK", "20"))
+TABULAR_READ_ROWS = int(os.getenv("TABULAR_READ_ROWS", "10000"))
+
+TABULAR_EXTENSIONS = {".csv", ".tsv", ".xlsx", ".xlsm", ".parquet"}
+
+
+def is_tabular(file_path: str) -> bool:
+    return Path(file_path).suffix.lower() in TABULAR_EXTENSIONS
+
+
+def render_row_groups(df: pd.DataFrame, rows_per_chunk: int = TABULAR_ROWS_PER_CHUNK) -> List[str]:
+    """
+    Renders a block of rows as text chunks of `rows_per_chunk` rows each, prefixed with the
+    header line. Rows are built with vectorized string concatenation instead of to_string().
+    """
+    if df.empty:
+        return []
+    header = ", ".join(str(column) for column in df.columns)
+    columns = [df[column].astype("string").fillna("") for column in df.columns]
+    rows = columns[0].str.cat(columns[1:], sep=", ") if len(columns) > 1 else columns[0]
+    rows = rows.to_numpy(dtype=object)
+    return [
+        f"{header}\n" + "\n".join(rows[start:start + rows_per_chunk])
+        for start in range(0, len(rows), rows_per_chunk)
+    ]
+
+
+def _read_blocks(file_path: str, block_rows: int) -> Iterator[pd.DataFrame]:
+    ext = Path(file_path).suffix.lower()
+    if ext in (".csv", ".tsv"):
+        sep = "\t" if ext == ".tsv" else ","
+        with pd.read_csv(file_path, sep=sep, chunksize=block_rows) as reader:
+            yield from reader
+
+    elif ext in (".xlsx", ".xlsm"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ImportError("Reading Excel files requires 'openpyxl' (pip install openpyxl)")
+        # read_only mode streams rows from the sheet XML instead of loading the workbook
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    continue
+                header = [str(h) if h is not None else f"column_{i + 1}" for i, h in enumerate(header)]
+                block = []
+                for row in rows:
+                    block.append(row)
+                    if len(block) >= block_rows:
+                        yield pd.DataFrame(block, columns=header)
+                        block = []
+                if block:
+                    yield pd.DataFrame(block, columns=header)
+        finally:
+            workbook.close()
+
+    elif ext == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires 'pyarrow' (pip install pyarrow)")
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=block_rows):
+            yield batch.to_pandas()
+
+    else:
+        raise ValueError(f"Unsupported tabular file type: {ext}")
+
+
+def iter_table_blocks(file_path: str, rows_per_chunk: int = TABULAR_ROWS_PER_CHUNK,
+                      read_rows: int = TABULAR_READ_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Reads a CSV/TSV/Excel/Parquet file in blocks of about `read_rows` rows, a multiple of
+    `rows_per_chunk` so row groups stay aligned across block boundaries.
+    """
+    block_rows = max(rows_per_chunk, (read_rows // rows_per_chunk) * rows_per_chunk)
+    yield from _read_blocks(file_path, block_rows)
+
+
+def iter_table_chunks(file_path: str, rows_per_chunk: int = TABULAR_ROWS_PER_CHUNK,
+                      read_rows: int = TABULAR_READ_ROWS) -> Iterator[List[str]]:
+    """
+    Reads a CSV/TSV/Excel/Parquet file block by block and yields the rendered chunks of each
+    block. Memory stays proportional to `read_rows`, not to the file size.
+    """
+    for block in iter_table_blocks(file_path, rows_per_chunk, read_rows):
+        chunks = render_row_groups(block, rows_per_chunk)
+        if chunks:
+            yield chunks
@@ -0,0 +1,70 @@
+import os
+from dotenv import load_dotenv
+from beanie.operators import Eq, NE
+from models.tempStorageModel import TempStorage
+from utils.metrics import timed
+
+load_dotenv()
+
+TEMP_STORAGE_FLUSH_CHUNKS = int(os.getenv("TEMP_STORAGE_FLUSH_CHUNKS", "200"))
+
+
+class TempStorageWriter:
+    """
+    Buffers chunks for one ingestion session and writes them to TempStorage every
+    `flush_size` chunks, so memory stays bounded no matter how much is ingested.
+    Chunks are strings or {"text": ..., **metadata} dicts; crawled pages are staged
+    next to them with `add_page`.
+    """
+
+    def __init__(self, session_id: str, flush_size: int = TEMP_STORAGE_FLUSH_CHUNKS):
+        self.session_id = session_id
+        self.flush_size = max(1, flush_size)
+        self.total_chunks = 0
+        self._buffer: list = []
+        self._pages: list = []
+
+    async def add(self, chunks: list):
+        self._buffer.extend(chunks)
+        self.total_chunks += len(chunks)
+        if len(self._buffer) >= self.flush_size:
+            await self.flush()
+
+    async def add_page(self, page: dict):
+        self._pages.append(page)
+        if len(self._pages) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer and not self._pages:
+            return
+        # One document per chunk or page, written in a single bulk insert
+        with timed("ingest", "stage_write"):
+            await TempStorage.insert_many(
+                [TempStorage(session_id=self.session_id, chunk=chunk) for chunk in self._buffer]
+                + [TempStorage(session_id=self.session_id, page=page) for page in self._pages]
+            )
+        self._buffer = []
+        self._pages = []
+
+
+async def iter_staged_chunks(session_id: str, batch_size: int = TEMP_STORAGE_FLUSH_CHUNKS):
+    """
+    Streams a session's staged chunks from a cursor in lists of `batch_size`.
+    """
+    batch = []
+    async for staged in TempStorage.find(Eq(TempStorage.session_id, session_id), NE(TempStorage.chunk, None)):
+        batch.append(staged.chunk)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def iter_staged_pages(session_id: str):
+    """
+    Streams the pages a crawl session staged with TempStorageWriter.add_page.
+    """
+    async for staged in TempStorage.find(Eq(TempStorage.session_id, session_id), NE(TempStorage.page, None)):
+        yield staged.page
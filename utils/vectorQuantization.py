@@ -0,0 +1,91 @@
+import os
+from typing import Optional, Tuple
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VECTOR_STORAGE_DTYPE = os.getenv("VECTOR_STORAGE_DTYPE", "float32")  # "float32", "float16" or "int8"
+VECTOR_SCORING = os.getenv("VECTOR_SCORING", "asymmetric")  # "asymmetric", "dequantize" or "auto"
+VECTOR_SCORING_BLOCK_ROWS = int(os.getenv("VECTOR_SCORING_BLOCK_ROWS", "1024"))
+
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+_INT8_MAX = 127.0
+# Decimals that keep a unit vector's values about as precise as the storage dtype
+_TRANSPORT_DECIMALS = {"float16": 5, "int8": 4}
+
+
+def storage_dtype(name: str = VECTOR_STORAGE_DTYPE) -> np.dtype:
+    if name not in STORAGE_DTYPES:
+        raise ValueError(f"Unknown VECTOR_STORAGE_DTYPE: {name} (expected one of {', '.join(STORAGE_DTYPES)})")
+    return np.dtype(STORAGE_DTYPES[name])
+
+
+def quantize(vectors: np.ndarray, dtype: np.dtype) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Encodes float32 rows as `dtype`. int8 uses symmetric per-vector scalar quantization:
+    each row is divided by its own scale (max |value| / 127) so it spans the full int8
+    range, and the float32 scales are returned alongside. Other dtypes return scales=None.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype != np.int8:
+        return vectors.astype(dtype, copy=False), None
+    scales = np.abs(vectors).max(axis=1) / _INT8_MAX
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    vectors = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        vectors = vectors * np.asarray(scales, dtype=np.float32)[:, None]
+    return vectors
+
+
+def uses_dequantized_copy(dtype: np.dtype, mode: str = VECTOR_SCORING) -> bool:
+    """
+    Whether a matrix of `dtype` should be scored from a float32 copy kept in RAM. Off by
+    default: the copy costs more memory than storing float32 in the first place, which
+    defeats the point of quantizing. "dequantize" opts in for every dtype and "auto" for
+    float16 only, whose upcast in numpy is ~7x slower than a float32 matmul (int8 scored
+    asymmetrically stays within ~2x).
+    """
+    if dtype == np.float32:
+        return False
+    return mode == "dequantize" or (mode == "auto" and dtype == np.float16)
+
+
+def score(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray,
+          block_rows: int = VECTOR_SCORING_BLOCK_ROWS) -> np.ndarray:
+    """
+    Asymmetric scoring: the float32 query is dotted with the stored codes directly and the
+    int8 per-vector scale is applied to the scores, never to the vectors. Rows are upcast a
+    block at a time, so a memory-mapped matrix is never materialized as float32 in full and
+    each upcast block stays in cache (small blocks measured ~3x faster than 64k rows).
+    """
+    if codes.dtype == np.float32:
+        return codes @ query
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), block_rows):
+        scores[start:start + block_rows] = codes[start:start + block_rows].astype(np.float32) @ query
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+def transport_values(vector: np.ndarray, name: str = VECTOR_STORAGE_DTYPE) -> list:
+    """
+    Converts one vector to the float list a JSON API expects. In float16/int8 mode values
+    are rounded to the storage precision first: JSON prints the shortest repr, so a batch
+    of 384-dim vectors is ~2.5x smaller than with full float32 digits.
+    """
+    decimals = _TRANSPORT_DECIMALS.get(name)
+    if decimals is None:
+        return vector.tolist()
+    return np.round(vector.astype(np.float64), decimals).tolist()
+
+
+def storage_bytes(count: int, dimension: int, dtype: np.dtype) -> int:
+    # Codes plus the float32 scale kept per int8 vector
+    return count * (dimension * np.dtype(dtype).itemsize + (4 if dtype == np.int8 else 0))
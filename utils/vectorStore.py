@@ -0,0 +1,739 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+import numpy as np
+from dotenv import load_dotenv
+from utils.executors import run_io
+from utils.vectorQuantization import storage_dtype, quantize, dequantize, score, uses_dequantized_copy, transport_values
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")  # "pinecone" or "local"
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "vectorStore")
+VECTOR_STORE_IVF = os.getenv("VECTOR_STORE_IVF", "false").lower() == "true"
+VECTOR_STORE_IVF_MIN_VECTORS = int(os.getenv("VECTOR_STORE_IVF_MIN_VECTORS", "20000"))
+VECTOR_STORE_IVF_NPROBE = int(os.getenv("VECTOR_STORE_IVF_NPROBE", "8"))
+VECTOR_STORE_IVF_REBUILD_GROWTH = float(os.getenv("VECTOR_STORE_IVF_REBUILD_GROWTH", "0.5"))
+VECTOR_UPSERT_BATCH_SIZE = int(os.getenv("VECTOR_UPSERT_BATCH_SIZE", "100"))
+VECTOR_UPSERT_MAX_IN_FLIGHT = int(os.getenv("VECTOR_UPSERT_MAX_IN_FLIGHT", "4"))
+VECTOR_UPSERT_MAX_RETRIES = int(os.getenv("VECTOR_UPSERT_MAX_RETRIES", "5"))
+VECTOR_UPSERT_BACKOFF_SECONDS = float(os.getenv("VECTOR_UPSERT_BACKOFF_SECONDS", "0.5"))
+
+DEFAULT_PARTITION = "_default"
+
+
+class VectorStore:
+    """
+    Interface shared by all vector store backends.
+    Vectors are passed as (id, values, metadata) tuples and matches are returned as
+    {"id": ..., "score": ..., "metadata": {...}} dicts, best match first.
+    """
+
+    async def upsert(self, vectors: list, namespace: Optional[str] = None):
+        raise NotImplementedError
+
+    async def query(self, vector, top_k: int = 5, filter: Optional[dict] = None,
+                    namespace: Optional[str] = None) -> List[dict]:
+        raise NotImplementedError
+
+    async def delete(self, ids: List[str], namespace: Optional[str] = None, botId: Optional[str] = None):
+        raise NotImplementedError
+
+    async def delete_bot(self, botId: str, namespace: Optional[str] = None):
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    """
+    Pinecone serverless index backend.
+    """
+
+    def __init__(self, index_name: str = None, dimension: int = 384,
+                 cloud: str = "aws", region: str = "us-east-1"):
+        self.index_name = index_name or os.getenv("PINECONE_INDEX_NAME")
+        self.dimension = dimension
+        self.cloud = cloud
+        self.region = region
+        self._index = None
+
+    async def _get_index(self):
+        if self._index is None:
+            from utils.clients import clients
+            self._index = await clients.pinecone_index(
+                self.index_name,
+                dimension=self.dimension,
+                cloud=self.cloud,
+                region=self.region
+            )
+        return self._index
+
+    async def upsert(self, vectors: list, namespace: Optional[str] = None):
+        index = await self._get_index()
+        # Only one batch is converted to Python floats at a time. Pinecone stores float32
+        # regardless of VECTOR_STORAGE_DTYPE; the compact modes only shrink the payload
+        records = [
+            (vid, transport_values(values) if isinstance(values, np.ndarray) else values, metadata)
+            for vid, values, metadata in vectors
+        ]
+        await run_io(index.upsert, vectors=records, namespace=namespace)
+
+    async def query(self, vector, top_k: int = 5, filter: Optional[dict] = None,
+                    namespace: Optional[str] = None) -> List[dict]:
+        index = await self._get_index()
+        if isinstance(vector, np.ndarray):
+            vector = vector.tolist()
+        results = await run_io(
+            index.query,
+            vector=vector,
+            top_k=top_k,
+            namespace=namespace,
+            include_metadata=True,
+            filter=filter
+        )
+        return [
+            {"id": match["id"], "score": match["score"], "metadata": match.get("metadata") or {}}
+            for match in results["matches"]
+        ]
+
+    async def delete(self, ids: List[str], namespace: Optional[str] = None, botId: Optional[str] = None):
+        index = await self._get_index()
+        # Pinecone accepts at most 1000 ids per delete call
+        for start in range(0, len(ids), 1000):
+            await run_io(index.delete, ids=ids[start:start + 1000], namespace=namespace)
+
+    async def delete_bot(self, botId: str, namespace: Optional[str] = None):
+        index = await self._get_index()
+        # Serverless indexes can't delete by metadata filter; vector ids are prefixed with the bot id
+        # Pages are fetched one at a time and deleted as they arrive, never all ids at once
+        id_pages = index.list(prefix=f"{botId}#", namespace=namespace)
+        while True:
+            page = await run_io(next, id_pages, None)
+            if page is None:
+                break
+            ids = _page_ids(page)
+            if ids:
+                await run_io(index.delete, ids=ids, namespace=namespace)
+
+
+def _page_ids(page) -> List[str]:
+    """
+    Ids of one `Index.list()` page: pinecone 10.x yields ListResponse objects whose
+    `vectors` are ListItems, older SDKs yield plain lists of id strings.
+    """
+    items = getattr(page, "vectors", page)
+    return [item if isinstance(item, str) else item.id for item in items]
+
+
+def _matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """
+    Evaluates a Pinecone-style metadata filter ($eq, $ne, $in, $nin, $and, $or).
+    """
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq" and value != expected:
+                return False
+            if op == "$ne" and value == expected:
+                return False
+            if op == "$in" and value not in expected:
+                return False
+            if op == "$nin" and value in expected:
+                return False
+    return True
+
+
+def _bot_from_filter(filter: Optional[dict]) -> Optional[str]:
+    if not filter or "botId" not in filter:
+        return None
+    condition = filter["botId"]
+    if isinstance(condition, dict):
+        return condition.get("$eq")
+    return condition
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means on unit vectors, trained on a sample. Returns unit-norm centroids.
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), n_clusters * 64)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = sample[assignments == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32)
+
+
+class _Partition:
+    """
+    One bot's vectors, stored append-only so a write costs O(batch), not O(partition):
+    rows of unit vectors in vectors.bin (memory-mapped, VECTOR_STORAGE_DTYPE; int8 rows
+    have a per-vector scale in scales.bin) and one JSON line per written row in meta.jsonl.
+    Re-upserting an id overwrites its row in place and appends a newer meta line; deletes
+    compact the files. A partition written with another dtype is converted on its next write.
+    Callers hold `lock` around every method; the partition loads itself on first use.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.ids: List[str] = []
+        self.metadata: List[dict] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.dtype = storage_dtype()
+        self.stored_dtype: Optional[np.dtype] = None
+        self.dimension: Optional[int] = None
+        self.vectors: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.meta_lines = 0
+        self._dequantized_buffer: Optional[np.ndarray] = None
+        self._dequantized_rows = 0
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments: Optional[np.ndarray] = None
+        self.ivf_rows = 0
+
+    @property
+    def layout_file(self) -> Path:
+        return self.path / "layout.json"
+
+    @property
+    def vectors_file(self) -> Path:
+        return self.path / "vectors.bin"
+
+    @property
+    def scales_file(self) -> Path:
+        return self.path / "scales.bin"
+
+    @property
+    def meta_file(self) -> Path:
+        return self.path / "meta.jsonl"
+
+    @property
+    def ivf_file(self) -> Path:
+        return self.path / "ivf.npz"
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        if (self.path / "meta.json").exists() and not self.layout_file.exists():
+            self._migrate_legacy()
+        if not self.layout_file.exists() or not self.meta_file.exists():
+            return
+        with open(self.layout_file, "r", encoding="utf-8") as f:
+            layout = json.load(f)
+        self.stored_dtype = np.dtype(layout["dtype"])
+        self.dimension = layout["dimension"]
+        with open(self.meta_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row, vid, meta = json.loads(line)
+                except ValueError:
+                    break  # torn last line of an interrupted write
+                self.meta_lines += 1
+                if row == len(self.ids):
+                    self.ids.append(vid)
+                    self.metadata.append(meta)
+                    self.id_to_row[vid] = row
+                elif row < len(self.ids):
+                    self.metadata[row] = meta
+        self._map_vectors()
+        if self.ivf_file.exists():
+            ivf = np.load(self.ivf_file)
+            self.centroids = ivf["centroids"]
+            self.assignments = ivf["assignments"][:len(self.ids)]
+            self.ivf_rows = len(self.assignments)
+            self._assign_new_rows()
+
+    def _migrate_legacy(self):
+        # vectors.npy + meta.json, rewritten as a whole on every write by earlier versions
+        with open(self.path / "meta.json", "r", encoding="utf-8") as f:
+            data = json.load(f)
+        vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        scales = np.load(self.path / "scales.npy") if (self.path / "scales.npy").exists() else None
+        self._rewrite(np.asarray(vectors), scales, data["ids"], data["metadata"])
+        for name in ("vectors.npy", "scales.npy", "meta.json", "ivf.npz"):
+            (self.path / name).unlink(missing_ok=True)
+
+    def _row_bytes(self, dtype: np.dtype) -> int:
+        return self.dimension * dtype.itemsize
+
+    def _map_vectors(self):
+        n = len(self.ids)
+        self.vectors = self.scales = None
+        if not n:
+            return
+        self.vectors = np.memmap(self.vectors_file, dtype=self.stored_dtype, mode="r", shape=(n, self.dimension))
+        if self.stored_dtype == np.int8:
+            self.scales = np.memmap(self.scales_file, dtype=np.float32, mode="r", shape=(n,))
+        if uses_dequantized_copy(self.stored_dtype):
+            # Grown with doubling capacity, so an append only dequantizes the new rows
+            buffer = self._dequantized_buffer
+            filled = self._dequantized_rows if buffer is not None else 0
+            if buffer is None or len(buffer) < n:
+                grown = np.empty((max(n, 2 * filled), self.dimension), dtype=np.float32)
+                if filled:
+                    grown[:filled] = buffer[:filled]
+                self._dequantized_buffer = buffer = grown
+            buffer[filled:n] = dequantize(self.vectors[filled:n], None if self.scales is None else self.scales[filled:n])
+            self._dequantized_rows = n
+        else:
+            self._dequantized_buffer = None
+
+    @property
+    def _dequantized(self) -> Optional[np.ndarray]:
+        if self._dequantized_buffer is None:
+            return None
+        return self._dequantized_buffer[:len(self.ids)]
+
+    def _rewrite(self, codes: np.ndarray, scales: Optional[np.ndarray], ids: List[str], metadata: List[dict]):
+        """
+        Replaces every file of the partition (used by deletes, dtype changes and to drop
+        superseded meta lines). Each file is written to a temp name and swapped in.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        codes = np.ascontiguousarray(codes)
+        self.dimension = codes.shape[1]
+        self.stored_dtype = codes.dtype
+        files = {self.vectors_file: codes.tobytes()}
+        if scales is not None:
+            files[self.scales_file] = np.ascontiguousarray(scales, dtype=np.float32).tobytes()
+        files[self.meta_file] = "".join(
+            json.dumps([row, vid, meta]) + "\n" for row, (vid, meta) in enumerate(zip(ids, metadata))
+        ).encode("utf-8")
+        files[self.layout_file] = json.dumps({"dtype": codes.dtype.name, "dimension": self.dimension}).encode("utf-8")
+        for path, data in files.items():
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        if scales is None:
+            self.scales_file.unlink(missing_ok=True)
+        self.ids = list(ids)
+        self.metadata = list(metadata)
+        self.id_to_row = {vid: row for row, vid in enumerate(self.ids)}
+        self.meta_lines = len(self.ids)
+        self._dequantized_buffer = None
+        self._map_vectors()
+
+    def upsert(self, ids: List[str], vectors: np.ndarray, metadata: List[dict]):
+        self.ensure_loaded()
+        codes, scales = quantize(_normalize(np.asarray(vectors, dtype=np.float32)), self.dtype)
+        if self.dimension is not None and self.ids and codes.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {codes.shape[1]} does not match stored dimension {self.dimension}")
+
+        if not self.ids or self.stored_dtype != self.dtype:
+            # Empty partition or dtype change: write everything in the configured dtype
+            old_codes, old_scales = quantize(dequantize(self.vectors, self.scales), self.dtype) \
+                if self.ids else (np.zeros((0, codes.shape[1]), dtype=self.dtype), None)
+            if scales is not None and old_scales is None:
+                old_scales = np.zeros(0, dtype=np.float32)
+            self._rewrite(old_codes, old_scales, self.ids, self.metadata)
+            self._rebuild_ivf()
+
+        # Last write of an id within the batch wins
+        latest = {vid: i for i, vid in enumerate(ids)}
+        updated = [(self.id_to_row[vid], i) for vid, i in latest.items() if vid in self.id_to_row]
+        added = [(vid, i) for vid, i in latest.items() if vid not in self.id_to_row]
+        n = len(self.ids)
+        row_bytes = self._row_bytes(self.dtype)
+
+        if added:
+            new = np.fromiter((i for _, i in added), dtype=np.int64, count=len(added))
+            # Drop rows left behind by an interrupted write before appending
+            with open(self.vectors_file, "ab") as f:
+                f.truncate(n * row_bytes)
+                f.write(np.ascontiguousarray(codes[new]).tobytes())
+            if scales is not None:
+                with open(self.scales_file, "ab") as f:
+                    f.truncate(n * 4)
+                    f.write(scales[new].tobytes())
+        if updated:
+            rows = np.fromiter((row for row, _ in updated), dtype=np.int64, count=len(updated))
+            src = np.fromiter((i for _, i in updated), dtype=np.int64, count=len(updated))
+            matrix = np.memmap(self.vectors_file, dtype=self.dtype, mode="r+", shape=(n, self.dimension))
+            matrix[rows] = codes[src]
+            matrix.flush()
+            del matrix
+            if scales is not None:
+                stored_scales = np.memmap(self.scales_file, dtype=np.float32, mode="r+", shape=(n,))
+                stored_scales[rows] = scales[src]
+                stored_scales.flush()
+                del stored_scales
+
+        lines = []
+        for row, i in updated:
+            self.metadata[row] = metadata[i] or {}
+            lines.append(json.dumps([row, ids[i], self.metadata[row]]))
+        for vid, i in added:
+            row = len(self.ids)
+            self.id_to_row[vid] = row
+            self.ids.append(vid)
+            self.metadata.append(metadata[i] or {})
+            lines.append(json.dumps([row, vid, self.metadata[row]]))
+        with open(self.meta_file, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self.meta_lines += len(lines)
+
+        self._map_vectors()
+        if updated and self._dequantized_buffer is not None:
+            rows = [row for row, _ in updated]
+            self._dequantized_buffer[rows] = dequantize(self.vectors[rows], None if self.scales is None else self.scales[rows])
+        if self.meta_lines > 2 * len(self.ids):
+            # Mostly superseded lines (repeated refreshes of the same pages): compact
+            self._rewrite(self.vectors, self.scales, self.ids, self.metadata)
+        self._update_ivf(updated_rows=[row for row, _ in updated])
+
+    def delete(self, ids: List[str]):
+        self.ensure_loaded()
+        rows = {self.id_to_row[vid] for vid in ids if vid in self.id_to_row}
+        if not rows:
+            return
+        if len(rows) == len(self.ids):
+            # Nothing left: an empty file can't be memory-mapped, drop the partition files
+            shutil.rmtree(self.path, ignore_errors=True)
+            lock = self.lock
+            self.__init__(self.path)
+            self.lock = lock
+            self.loaded = True
+            return
+        keep = np.array([row for row in range(len(self.ids)) if row not in rows], dtype=np.int64)
+        assignments = self.assignments[keep] if self.assignments is not None else None
+        self._rewrite(
+            self.vectors[keep],
+            self.scales[keep] if self.scales is not None else None,
+            [self.ids[row] for row in keep],
+            [self.metadata[row] for row in keep]
+        )
+        if assignments is not None:
+            self.assignments = assignments
+            self.ivf_rows = len(assignments)
+            self._save_ivf()
+        self._update_ivf()
+
+    def _float_rows(self, start: int, stop: int) -> np.ndarray:
+        if self._dequantized_buffer is not None:
+            return self._dequantized_buffer[start:stop]
+        return dequantize(self.vectors[start:stop], None if self.scales is None else self.scales[start:stop])
+
+    def _update_ivf(self, updated_rows: List[int] = ()):
+        """
+        k-means is re-run only when the partition has grown by VECTOR_STORE_IVF_REBUILD_GROWTH
+        since the last build; rows written in between are assigned to their nearest centroid.
+        """
+        n = len(self.ids)
+        if not VECTOR_STORE_IVF or n < VECTOR_STORE_IVF_MIN_VECTORS:
+            if self.centroids is not None or self.ivf_file.exists():
+                self.centroids = self.assignments = None
+                self.ivf_rows = 0
+                self.ivf_file.unlink(missing_ok=True)
+            return
+        if self.centroids is None or n >= self.ivf_rows * (1 + VECTOR_STORE_IVF_REBUILD_GROWTH):
+            self._rebuild_ivf()
+            return
+        if len(updated_rows):
+            rows = np.asarray(updated_rows, dtype=np.int64)
+            vectors = dequantize(self.vectors[rows], None if self.scales is None else self.scales[rows])
+            self.assignments[rows] = np.argmax(vectors @ self.centroids.T, axis=1)
+        self._assign_new_rows()
+
+    def _assign_new_rows(self):
+        n = len(self.ids)
+        if self.centroids is None or len(self.assignments) >= n:
+            return
+        start = len(self.assignments)
+        new = np.argmax(self._float_rows(start, n) @ self.centroids.T, axis=1).astype(np.int32)
+        self.assignments = np.concatenate([self.assignments, new])
+
+    def _rebuild_ivf(self):
+        n = len(self.ids)
+        if not VECTOR_STORE_IVF or n < VECTOR_STORE_IVF_MIN_VECTORS:
+            self.centroids = self.assignments = None
+            self.ivf_rows = 0
+            self.ivf_file.unlink(missing_ok=True)
+            return
+        vectors = self._float_rows(0, n)
+        n_clusters = max(1, int(np.sqrt(n)))
+        self.centroids = _kmeans(vectors, n_clusters)
+        self.assignments = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+        self.ivf_rows = n
+        self._save_ivf()
+
+    def _save_ivf(self):
+        # Rows appended after this are re-assigned from the centroids on load
+        np.savez(self.ivf_file, centroids=self.centroids, assignments=self.assignments)
+
+    def search(self, query: np.ndarray, top_k: int, filter: Optional[dict]) -> List[dict]:
+        self.ensure_loaded()
+        if self.vectors is None or not self.ids:
+            return []
+
+        if self.centroids is not None:
+            # Cluster-pruned search: only score rows in the closest nprobe clusters
+            nprobe = min(VECTOR_STORE_IVF_NPROBE, len(self.centroids))
+            centroid_scores = self.centroids @ query
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            rows = np.flatnonzero(np.isin(self.assignments, probe))
+        else:
+            rows = None
+
+        dequantized = self._dequantized
+        if dequantized is not None:
+            scores = (dequantized[rows] if rows is not None else dequantized) @ query
+        elif rows is not None:
+            scores = score(self.vectors[rows], self.scales[rows] if self.scales is not None else None, query)
+        else:
+            scores = score(self.vectors, self.scales, query)
+        if rows is None:
+            rows = np.arange(len(scores))
+        if not len(scores):
+            return []
+
+        if filter:
+            # Metadata is only checked for candidates in score order until top_k pass
+            top = []
+            for i in np.argsort(-scores):
+                if _matches_filter(self.metadata[rows[i]], filter):
+                    top.append(i)
+                    if len(top) == top_k:
+                        break
+        else:
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+        return [
+            {"id": self.ids[rows[i]], "score": float(scores[i]), "metadata": self.metadata[rows[i]]}
+            for i in top
+        ]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process backend. Each bot's vectors live in a memory-mapped matrix (float32, float16
+    or int8, see VECTOR_STORAGE_DTYPE) under `base_dir/<namespace>/<botId>/`, searched with
+    a vectorized cosine top-k. Every file access and search runs in the I/O executor under
+    the partition's own lock, so writes to one bot never stall the event loop or other bots.
+    """
+
+    def __init__(self, base_dir: str = VECTOR_STORE_DIR):
+        self.base_dir = Path(base_dir)
+        self._partitions: Dict[tuple, _Partition] = {}
+        # Guards the partition table only; partitions are locked individually
+        self._lock = threading.Lock()
+
+    def _namespace_dir(self, namespace: Optional[str]) -> Path:
+        return self.base_dir / (namespace or DEFAULT_PARTITION)
+
+    def _partition(self, namespace: Optional[str], botId: Optional[str]) -> _Partition:
+        key = (namespace or DEFAULT_PARTITION, botId or DEFAULT_PARTITION)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = _Partition(self._namespace_dir(namespace) / key[1])
+                self._partitions[key] = partition
+        return partition
+
+    async def upsert(self, vectors: list, namespace: Optional[str] = None):
+        grouped: Dict[str, tuple] = {}
+        for vid, values, metadata in vectors:
+            botId = (metadata or {}).get("botId") or DEFAULT_PARTITION
+            ids, vals, metas = grouped.setdefault(botId, ([], [], []))
+            ids.append(vid)
+            vals.append(values)
+            metas.append(metadata)
+
+        def write():
+            for botId, (ids, vals, metas) in grouped.items():
+                partition = self._partition(namespace, botId)
+                with partition.lock:
+                    partition.upsert(ids, np.asarray(vals, dtype=np.float32), metas)
+
+        # Appending to the memory-mapped files is disk-bound, keep it off the event loop
+        await run_io(write)
+
+    async def query(self, vector, top_k: int = 5, filter: Optional[dict] = None,
+                    namespace: Optional[str] = None) -> List[dict]:
+        query = _normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        botId = _bot_from_filter(filter)
+
+        def search():
+            if botId is not None:
+                partitions = [self._partition(namespace, botId)]
+                # Each partition holds one bot, so the botId condition needs no per-row check
+                residual = {key: value for key, value in filter.items() if key != "botId"}
+            else:
+                ns_dir = self._namespace_dir(namespace)
+                names = [p.name for p in ns_dir.iterdir() if p.is_dir()] if ns_dir.exists() else []
+                partitions = [self._partition(namespace, name) for name in names]
+                residual = filter
+            matches = []
+            for partition in partitions:
+                with partition.lock:
+                    matches.extend(partition.search(query, top_k, residual))
+            return matches
+
+        # First use loads the partition from disk, and scoring a large bot takes a while
+        matches = await run_io(search)
+        matches.sort(key=lambda m: m["score"], reverse=True)
+        return matches[:top_k]
+
+    async def delete(self, ids: List[str], namespace: Optional[str] = None, botId: Optional[str] = None):
+        grouped: Dict[str, list] = {}
+        for vid in ids:
+            # Vector ids are "<botId>#<hash>", see make_vector_id
+            owner = botId or (vid.split("#", 1)[0] if "#" in vid else DEFAULT_PARTITION)
+            grouped.setdefault(owner, []).append(vid)
+
+        def remove():
+            for owner, owner_ids in grouped.items():
+                partition = self._partition(namespace, owner)
+                with partition.lock:
+                    partition.delete(owner_ids)
+
+        await run_io(remove)
+
+    async def delete_bot(self, botId: str, namespace: Optional[str] = None):
+        def remove():
+            with self._lock:
+                partition = self._partitions.pop((namespace or DEFAULT_PARTITION, botId), None)
+            path = self._namespace_dir(namespace) / botId
+            if partition is not None:
+                with partition.lock:
+                    shutil.rmtree(path, ignore_errors=True)
+            elif path.exists():
+                shutil.rmtree(path)
+
+        await run_io(remove)
+
+
+def make_vector_id(botId: str, text: str) -> str:
+    """
+    Deterministic vector id: the same chunk of the same bot always maps to the same id,
+    so retried or repeated upserts overwrite instead of duplicating.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+    return f"{botId}#{digest}"
+
+
+async def upsert_batched(vector_store: VectorStore, vectors, namespace: Optional[str] = None,
+                         batch_size: int = VECTOR_UPSERT_BATCH_SIZE,
+                         max_in_flight: int = VECTOR_UPSERT_MAX_IN_FLIGHT,
+                         max_retries: int = VECTOR_UPSERT_MAX_RETRIES,
+                         backoff_seconds: float = VECTOR_UPSERT_BACKOFF_SECONDS,
+                         on_written: Optional[Callable[[list], Awaitable[None]]] = None) -> dict:
+    """
+    Streams (id, values, metadata) records from any iterable or async iterable into the
+    vector store in batches of `batch_size`, with at most `max_in_flight` batches pending
+    at once. Each batch is retried with exponential backoff; returns a written/failed report.
+    `await on_written(batch)` is called with every batch once it has been written.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+    report = {"total": 0, "written": 0, "failed": 0, "failed_batches": 0, "errors": []}
+    pending = set()
+
+    async def push(batch):
+        try:
+            for attempt in range(max_retries + 1):
+                try:
+                    await vector_store.upsert(vectors=batch, namespace=namespace)
+                    report["written"] += len(batch)
+                    break
+                except Exception as e:
+                    if attempt == max_retries:
+                        report["failed"] += len(batch)
+                        report["failed_batches"] += 1
+                        report["errors"].append(str(e))
+                        logger.error("Upsert batch of %d failed after %d attempts: %s", len(batch), attempt + 1, e)
+                        return
+                    delay = backoff_seconds * (2 ** attempt)
+                    await asyncio.sleep(delay + random.uniform(0, delay))
+            # Outside the retry loop: a failing callback must not re-upsert the batch
+            if on_written is not None:
+                await on_written(batch)
+        finally:
+            semaphore.release()
+
+    async def records():
+        if hasattr(vectors, "__aiter__"):
+            async for record in vectors:
+                yield record
+        else:
+            for record in vectors:
+                yield record
+
+    batch = []
+    try:
+        async for record in records():
+            batch.append(record)
+            report["total"] += 1
+            if len(batch) >= batch_size:
+                # Wait for a free slot before building more batches to keep memory bounded
+                await semaphore.acquire()
+                pending.add(asyncio.create_task(push(batch)))
+                pending = {task for task in pending if not task.done()}
+                batch = []
+        if batch:
+            await semaphore.acquire()
+            pending.add(asyncio.create_task(push(batch)))
+
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        # A cancelled caller (e.g. a cancelled ingestion job) must not leave batches writing
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return report
+
+
+_store: Optional[VectorStore] = None
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Returns the process-wide vector store selected by VECTOR_STORE_BACKEND.
+    """
+    global _store
+    if _store is None:
+        if VECTOR_STORE_BACKEND == "local":
+            _store = LocalVectorStore()
+        elif VECTOR_STORE_BACKEND == "pinecone":
+            _store = PineconeVectorStore()
+        else:
+            raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+    return _store